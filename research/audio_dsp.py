@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""NumPy signal helpers for converting captured audio to the pipeline format."""
+
+from __future__ import annotations
+
+import math
+from collections.abc import Callable
+from dataclasses import dataclass
+
+import numpy as np
+
+RESAMPLER_HALF_TAPS = 12
+RESAMPLER_KAISER_BETA = 8.6
+RESAMPLER_CUTOFF = 0.92
+RESAMPLER_CHUNK_OUTPUTS = 32768
+
+VAD_FRAME_SECONDS = 0.02
+VAD_THRESHOLD_DBFS = -45.0
+VAD_NOISE_MARGIN_DB = 10.0
+VAD_MIN_SPEECH_SECONDS = 0.15
+# Per-frame weight when the noise floor rises; it falls immediately.
+VAD_NOISE_RISE = 0.02
+
+
+def downmix(block: np.ndarray) -> np.ndarray:
+    """Average all channels of a (frames, channels) block into a new mono float32 vector."""
+    if block.ndim == 1:
+        return block.astype(np.float32)
+    if block.shape[1] == 1:
+        return block[:, 0].astype(np.float32)
+    return block.mean(axis=1, dtype=np.float32)
+
+
+class PolyphaseResampler:
+    """Streaming rational-ratio resampler (windowed-sinc polyphase FIR).
+
+    Feed mono float32 blocks through `process`, then call `flush` once to drain
+    the filter tail. Output is aligned with the input: the filter group delay
+    is trimmed, so `process` + `flush` over a whole signal yields
+    round(len(signal) * out_rate / in_rate) samples.
+    """
+
+    def __init__(self, in_rate: int, out_rate: int, *, half_taps: int = RESAMPLER_HALF_TAPS):
+        g = math.gcd(int(in_rate), int(out_rate))
+        self.up = int(out_rate) // g
+        self.down = int(in_rate) // g
+        self.passthrough = self.up == self.down
+
+        factor = max(self.up, self.down)
+        length = 2 * half_taps * factor + 1
+        cutoff = RESAMPLER_CUTOFF / factor
+        m = np.arange(length) - (length - 1) / 2
+        taps = self.up * cutoff * np.sinc(cutoff * m) * np.kaiser(length, RESAMPLER_KAISER_BETA)
+
+        self.taps_per_phase = -(-length // self.up)
+        padded = np.zeros(self.taps_per_phase * self.up)
+        padded[:length] = taps
+        # phases[p, k] = taps[p + k * up]
+        self._phases = padded.reshape(self.taps_per_phase, self.up).T.astype(np.float32)
+        self._history = np.zeros(self.taps_per_phase - 1, dtype=np.float32)
+        self._consumed = 0
+        self._next_output = 0
+        self._total_in = 0
+        self._emitted = 0
+        self._skip = int(round((length - 1) / 2 / self.down))
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        block = np.asarray(block, dtype=np.float32)
+        self._total_in += len(block)
+        if self.passthrough:
+            return block
+        return self._trim(self._filter(block))
+
+    def flush(self) -> np.ndarray:
+        if self.passthrough:
+            return np.zeros(0, dtype=np.float32)
+        expected = int(round(self._total_in * self.up / self.down))
+        drain = np.zeros(self.taps_per_phase + self._skip * self.down, dtype=np.float32)
+        tail = self._trim(self._filter(drain))
+        remaining = max(expected - self._emitted + len(tail), 0)
+        tail = tail[:remaining]
+        self._emitted = expected
+        return tail
+
+    def _trim(self, out: np.ndarray) -> np.ndarray:
+        if self._skip:
+            dropped = min(self._skip, len(out))
+            self._skip -= dropped
+            out = out[dropped:]
+        self._emitted += len(out)
+        return out
+
+    def _filter(self, block: np.ndarray) -> np.ndarray:
+        history = len(self._history)
+        buf = np.concatenate((self._history, block))
+        buf_start = self._consumed - history
+        total = self._consumed + len(block)
+        end_output = -(-total * self.up // self.down)
+
+        pieces = []
+        offsets = np.arange(self.taps_per_phase)
+        for first in range(self._next_output, end_output, RESAMPLER_CHUNK_OUTPUTS):
+            n = np.arange(first, min(first + RESAMPLER_CHUNK_OUTPUTS, end_output))
+            pos = n * self.down
+            base = pos // self.up - buf_start
+            window = buf[base[:, None] - offsets[None, :]]
+            pieces.append(np.einsum("ij,ij->i", window, self._phases[pos % self.up]))
+
+        self._history = buf[len(buf) - history :] if history else self._history
+        self._consumed = total
+        self._next_output = max(self._next_output, end_output)
+        if not pieces:
+            return np.zeros(0, dtype=np.float32)
+        return np.concatenate(pieces).astype(np.float32, copy=False)
+
+
+class SpeechEndpointer:
+    """Streaming energy VAD that detects the end of speech.
+
+    Feed mono float32 blocks of any size through `process`; it returns True
+    once at least `min_speech_seconds` of speech has been heard and been
+    followed by `silence_seconds` of continuous silence. A frame is speech
+    when its level is above both `threshold_dbfs` and the tracked noise floor
+    plus `noise_margin_db`.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int,
+        *,
+        silence_seconds: float,
+        threshold_dbfs: float = VAD_THRESHOLD_DBFS,
+        noise_margin_db: float = VAD_NOISE_MARGIN_DB,
+        min_speech_seconds: float = VAD_MIN_SPEECH_SECONDS,
+    ):
+        if silence_seconds <= 0:
+            raise ValueError("VAD silence window must be positive.")
+        self.frame = max(int(round(sample_rate * VAD_FRAME_SECONDS)), 1)
+        frame_seconds = self.frame / sample_rate
+        self.silence_frames_needed = max(int(math.ceil(silence_seconds / frame_seconds)), 1)
+        self.speech_frames_needed = max(int(math.ceil(min_speech_seconds / frame_seconds)), 1)
+        self.threshold_dbfs = threshold_dbfs
+        self.noise_margin_db = noise_margin_db
+        self.noise_dbfs = threshold_dbfs - noise_margin_db
+        self.speech_frames = 0
+        self.silence_frames = 0
+        self.frames = 0
+        self.ended = False
+        self._pending = np.zeros(0, dtype=np.float32)
+
+    @property
+    def speech_started(self) -> bool:
+        return self.speech_frames >= self.speech_frames_needed
+
+    def process(self, block: np.ndarray) -> bool:
+        if self.ended:
+            return True
+        buf = np.concatenate((self._pending, np.asarray(block, dtype=np.float32)))
+        count = len(buf) // self.frame
+        self._pending = buf[count * self.frame :]
+        if not count:
+            return False
+        frames = buf[: count * self.frame].reshape(count, self.frame)
+        levels = 10.0 * np.log10(np.mean(np.square(frames), axis=1) + 1e-12)
+        for index, level in enumerate(levels.tolist()):
+            self.frames += 1
+            if level >= max(self.threshold_dbfs, self.noise_dbfs + self.noise_margin_db):
+                self.speech_frames += 1
+                self.silence_frames = 0
+                continue
+            if level < self.noise_dbfs:
+                self.noise_dbfs = level
+            else:
+                self.noise_dbfs += VAD_NOISE_RISE * (level - self.noise_dbfs)
+            self.silence_frames += 1
+            if self.speech_started and self.silence_frames >= self.silence_frames_needed:
+                self.ended = True
+                # Keep unclassified frames so `frames` matches the end point exactly.
+                self._pending = np.concatenate((frames[index + 1 :].ravel(), self._pending))
+                return True
+        return False
+
+    def reset(self) -> None:
+        """Start looking for the next end of speech; keeps the noise floor and position."""
+        self.speech_frames = 0
+        self.silence_frames = 0
+        self.ended = False
+
+
+@dataclass
+class SpeechSegment:
+    index: int
+    audio: np.ndarray
+    final: bool
+    has_speech: bool
+
+
+class PauseSegmenter:
+    """Cuts a mono stream into consecutive segments at pauses in speech.
+
+    Feed blocks through `feed` and call `finish` once at the end. A segment
+    is emitted through `on_segment` when speech is followed by
+    `pause_seconds` of silence and the segment is at least
+    `min_segment_seconds` long; shorter ones keep growing into the next
+    pause. Segments are contiguous, so together they cover the whole stream.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int,
+        on_segment: Callable[[SpeechSegment], None],
+        *,
+        pause_seconds: float,
+        min_segment_seconds: float,
+        threshold_dbfs: float = VAD_THRESHOLD_DBFS,
+    ):
+        self.on_segment = on_segment
+        self.min_segment_samples = int(min_segment_seconds * sample_rate)
+        self.segments = 0
+        self._endpointer = SpeechEndpointer(
+            sample_rate, silence_seconds=pause_seconds, threshold_dbfs=threshold_dbfs
+        )
+        self._pieces: list[np.ndarray] = []
+        self._segment_start = 0
+        self._fed = 0
+        self._pending_speech = False
+
+    def feed(self, audio: np.ndarray) -> None:
+        audio = np.asarray(audio, dtype=np.float32)
+        self._pieces.append(audio)
+        self._fed += len(audio)
+        ended = self._endpointer.process(audio)
+        while ended:
+            cut = self._endpointer.frames * self._endpointer.frame
+            if cut - self._segment_start >= self.min_segment_samples:
+                self._emit(cut - self._segment_start, final=False, has_speech=True)
+            else:
+                # Too short to cut; the speech stays in the growing segment.
+                self._pending_speech = True
+            self._endpointer.reset()
+            ended = self._endpointer.process(np.zeros(0, dtype=np.float32))
+
+    def finish(self) -> None:
+        """Emit the remaining audio as the final segment."""
+        self._emit(
+            self._fed - self._segment_start,
+            final=True,
+            has_speech=self._pending_speech or self._endpointer.speech_frames > 0,
+        )
+
+    def _emit(self, length: int, *, final: bool, has_speech: bool) -> None:
+        buf = np.concatenate(self._pieces) if self._pieces else np.zeros(0, dtype=np.float32)
+        self._pieces = [buf[length:]] if len(buf) > length else []
+        self._segment_start += length
+        self._pending_speech = False
+        segment = SpeechSegment(self.segments, buf[:length], final, has_speech)
+        self.segments += 1
+        self.on_segment(segment)
+
+
+def resample(signal: np.ndarray, in_rate: int, out_rate: int) -> np.ndarray:
+    """Resample a whole mono signal in one pass."""
+    resampler = PolyphaseResampler(in_rate, out_rate)
+    return np.concatenate((resampler.process(signal), resampler.flush()))
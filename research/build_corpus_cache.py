@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""Utility: build a preprocessed, memory-mapped corpus cache from FLAC files."""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from corpus_cache import PAYLOAD_FORMATS, build_corpus_cache
+from pipeline_common import collect_flac_paths
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Build a packed corpus cache from .flac files.")
+    parser.add_argument(
+        "inputs",
+        nargs="+",
+        help="FLAC files and/or directories containing .flac files.",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default="corpus-cache",
+        help="Directory to write the cache into (default: ./corpus-cache).",
+    )
+    parser.add_argument(
+        "--formats",
+        nargs="+",
+        choices=sorted(PAYLOAD_FORMATS),
+        default=["flac"],
+        help="Encoded payload formats to cache per recording (default: flac).",
+    )
+    parser.add_argument(
+        "--trim-threshold-dbfs",
+        type=float,
+        default=None,
+        help="Trim leading/trailing audio quieter than this level, e.g. -50.",
+    )
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    flac_paths = collect_flac_paths(args.inputs)
+    if not flac_paths:
+        print("No .flac inputs found.", file=sys.stderr)
+        return 2
+
+    cache_dir = Path(args.cache_dir).expanduser().resolve()
+    start = time.perf_counter()
+    try:
+        entries = build_corpus_cache(
+            flac_paths,
+            cache_dir,
+            formats=tuple(args.formats),
+            trim_threshold_dbfs=args.trim_threshold_dbfs,
+        )
+    except Exception as exc:  # noqa: BLE001
+        print(f"Corpus build failed: {exc}", file=sys.stderr)
+        return 1
+
+    skipped = len(flac_paths) - len(entries)
+    if skipped:
+        print(f"Skipped {skipped} recording(s) with no audio (after trimming).", file=sys.stderr)
+    audio_seconds = sum(entry.seconds for entry in entries)
+    print(
+        f"Cached {len(entries)} recording(s), {audio_seconds:.1f}s of audio, "
+        f"in {time.perf_counter() - start:.2f}s"
+    )
+    print(f"Saved cache: {cache_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
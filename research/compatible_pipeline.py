@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""Configurable pipeline for any OpenAI-compatible ASR/LLM server.
+
+Pipelines are declared in a JSON file (see `pipelines.example.json`), e.g. a
+whisper server and an LLM server on localhost or the LAN:
+
+    {
+      "pipelines": {
+        "local": {
+          "transcribe_base_url": "http://127.0.0.1:8080/v1",
+          "transcribe_model": "whisper-large-v3",
+          "rewrite_base_url": "http://127.0.0.1:11434/v1",
+          "rewrite_model": "llama3.1:8b"
+        }
+      }
+    }
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import time
+from dataclasses import dataclass, fields
+from pathlib import Path
+from typing import Any
+
+from groq_pipeline import _parse_chat_completion_output
+from openai_pipeline import _parse_openai_responses_output
+from pipeline_common import (
+    EDIT_REWRITE_PROMPT,
+    PipelineResult,
+    REWRITE_PROMPT,
+    REWRITE_PROTOCOLS,
+    TokenUsage,
+    auth_headers,
+    flac_duration_seconds,
+    parse_token_usage,
+    post_multipart_transcription,
+    requests_post,
+    rewrite_with_edits,
+    validate_flac_path,
+)
+from rate_limit import StageTimer
+from tracing import span
+
+PIPELINES_CONFIG_ENV = "YADA_PIPELINES_CONFIG"
+REWRITE_APIS = ("chat", "responses")
+PRICING_KEYS = ("input", "cached_input", "output", "audio_hour")
+
+
+def _parse_pricing(name: str, key: str, value: Any) -> dict[str, float]:
+    """Validate a price override such as {"audio_hour": 0.02} or {"input": 0.1, "output": 0.4}."""
+    if not isinstance(value, dict) or not value:
+        raise ValueError(f"Pipeline {name!r} {key} must be a non-empty object.")
+    unknown = sorted(set(value) - set(PRICING_KEYS))
+    if unknown:
+        raise ValueError(f"Pipeline {name!r} {key} has unknown key(s): {', '.join(unknown)}")
+    if not all(isinstance(price, (int, float)) and price >= 0 for price in value.values()):
+        raise ValueError(f"Pipeline {name!r} {key} prices must be non-negative numbers.")
+    pricing = {price_key: float(price) for price_key, price in value.items()}
+    if "audio_hour" not in pricing:
+        if "input" not in pricing or "output" not in pricing:
+            raise ValueError(f"Pipeline {name!r} {key} needs audio_hour, or input and output.")
+        pricing.setdefault("cached_input", pricing["input"])
+    return pricing
+
+
+@dataclass
+class CompatiblePipelineConfig:
+    name: str
+    transcribe_base_url: str
+    transcribe_model: str
+    rewrite_base_url: str
+    rewrite_model: str
+    description: str = ""
+    # "chat" for /chat/completions (most local servers), "responses" for /responses.
+    rewrite_api: str = "chat"
+    rewrite_protocol: str = "full"
+    rewrite_temperature: float | None = 0.0
+    # Name of the environment variable holding the API key; unset means no auth.
+    api_key_env: str | None = None
+    timeout_seconds: float | None = None
+    # Optional prices in MODEL_PRICING_USD form. Config pipelines never use the
+    # list prices (a local whisper-large-v3 is not billed like Groq's), so
+    # without these their cost is 0.
+    transcribe_pricing: dict[str, float] | None = None
+    rewrite_pricing: dict[str, float] | None = None
+
+    @classmethod
+    def from_dict(cls, name: str, data: dict[str, Any]) -> CompatiblePipelineConfig:
+        if not isinstance(data, dict):
+            raise ValueError(f"Pipeline {name!r} config must be an object.")
+        known = {field.name for field in fields(cls)} - {"name"}
+        unknown = sorted(set(data) - known)
+        if unknown:
+            raise ValueError(f"Pipeline {name!r} has unknown key(s): {', '.join(unknown)}")
+        required = ("transcribe_base_url", "transcribe_model", "rewrite_base_url", "rewrite_model")
+        missing = [key for key in required if not data.get(key)]
+        if missing:
+            raise ValueError(f"Pipeline {name!r} is missing: {', '.join(missing)}")
+        config = cls(name=name, **data)
+        for key in ("transcribe_pricing", "rewrite_pricing"):
+            value = getattr(config, key)
+            if value is not None:
+                setattr(config, key, _parse_pricing(name, key, value))
+        if config.rewrite_api not in REWRITE_APIS:
+            raise ValueError(f"Pipeline {name!r} has unknown rewrite_api: {config.rewrite_api}")
+        if config.rewrite_protocol not in REWRITE_PROTOCOLS:
+            raise ValueError(
+                f"Pipeline {name!r} has unknown rewrite_protocol: {config.rewrite_protocol}"
+            )
+        return config
+
+    @property
+    def transcribe_url(self) -> str:
+        return f"{self.transcribe_base_url.rstrip('/')}/audio/transcriptions"
+
+    @property
+    def api_key(self) -> str:
+        return os.getenv(self.api_key_env, "") if self.api_key_env else ""
+
+    def describe(self) -> str:
+        if self.description:
+            return self.description
+        return (
+            f"OpenAI-compatible pipeline ({self.transcribe_model} @ {self.transcribe_base_url} -> "
+            f"{self.rewrite_model} @ {self.rewrite_base_url})"
+        )
+
+
+def load_pipeline_configs(path: str | Path) -> dict[str, CompatiblePipelineConfig]:
+    config_path = Path(path).expanduser().resolve()
+    payload = json.loads(config_path.read_text(encoding="utf-8"))
+    pipelines = payload.get("pipelines") if isinstance(payload, dict) else None
+    if not isinstance(pipelines, dict):
+        raise ValueError(f"{config_path.name} must contain a `pipelines` object.")
+    configs: dict[str, CompatiblePipelineConfig] = {}
+    for name, data in pipelines.items():
+        pipeline_id = name.strip().lower()
+        if not pipeline_id or pipeline_id in configs:
+            raise ValueError(f"Empty or duplicate pipeline id: {name!r}")
+        configs[pipeline_id] = CompatiblePipelineConfig.from_dict(pipeline_id, data)
+    return configs
+
+
+def default_pipelines_config_path() -> Path | None:
+    """The config named by YADA_PIPELINES_CONFIG, else ./pipelines.json if present."""
+    env_path = os.getenv(PIPELINES_CONFIG_ENV)
+    if env_path:
+        return Path(env_path)
+    local = Path.cwd() / "pipelines.json"
+    return local if local.exists() else None
+
+
+def _compatible_rewrite(
+    config: CompatiblePipelineConfig,
+    *,
+    transcript: str,
+    timeout_seconds: float,
+    instructions: str = REWRITE_PROMPT,
+    json_mode: bool = False,
+) -> tuple[str, TokenUsage]:
+    base_url = config.rewrite_base_url.rstrip("/")
+    if config.rewrite_api == "responses":
+        url = f"{base_url}/responses"
+        payload: dict[str, Any] = {
+            "model": config.rewrite_model,
+            "input": transcript,
+            "instructions": instructions,
+        }
+        if json_mode:
+            payload["text"] = {"format": {"type": "json_object"}}
+        parse = _parse_openai_responses_output
+    else:
+        url = f"{base_url}/chat/completions"
+        payload = {
+            "model": config.rewrite_model,
+            "messages": [
+                {"role": "system", "content": instructions},
+                {"role": "user", "content": transcript},
+            ],
+        }
+        if json_mode:
+            payload["response_format"] = {"type": "json_object"}
+        parse = _parse_chat_completion_output
+    if config.rewrite_temperature is not None:
+        payload["temperature"] = config.rewrite_temperature
+
+    with span("rewrite.request", model=config.rewrite_model, chars=len(transcript)):
+        response = requests_post(
+            url,
+            headers={**auth_headers(config.api_key), "Content-Type": "application/json"},
+            json=payload,
+            timeout=timeout_seconds,
+        )
+        response.raise_for_status()
+    with span("rewrite.parse"):
+        response_payload = response.json()
+        return parse(response_payload), parse_token_usage(response_payload)
+
+
+def run_compatible_pipeline_from_flac(
+    flac_path: str | Path,
+    *,
+    config: CompatiblePipelineConfig,
+    timeout_seconds: float = 180.0,
+) -> PipelineResult:
+    """Run a configured pipeline; the config's own timeout wins when set."""
+    flac = validate_flac_path(flac_path)
+    timeout = config.timeout_seconds or timeout_seconds
+    api_key = config.api_key
+    if config.api_key_env and not api_key:
+        raise ValueError(f"Missing API key in ${config.api_key_env} for pipeline {config.name}.")
+
+    start_total = time.perf_counter()
+
+    with StageTimer() as asr_timer:
+        raw, asr_usage = post_multipart_transcription(
+            url=config.transcribe_url,
+            api_key=api_key,
+            model=config.transcribe_model,
+            flac_path=flac,
+            timeout_seconds=timeout,
+        )
+
+    edits = 0
+    fallback = False
+    with StageTimer() as rewrite_timer:
+        if config.rewrite_protocol == "edits":
+            outcome = rewrite_with_edits(
+                raw,
+                rewrite_edits=lambda transcript: _compatible_rewrite(
+                    config,
+                    transcript=transcript,
+                    timeout_seconds=timeout,
+                    instructions=EDIT_REWRITE_PROMPT,
+                    json_mode=True,
+                ),
+                rewrite_full=lambda transcript: _compatible_rewrite(
+                    config,
+                    transcript=transcript,
+                    timeout_seconds=timeout,
+                ),
+            )
+            rewritten, rewrite_usage = outcome.text, outcome.usage
+            edits, fallback = outcome.edits, outcome.fallback
+        else:
+            rewritten, rewrite_usage = _compatible_rewrite(
+                config,
+                transcript=raw,
+                timeout_seconds=timeout,
+            )
+
+    return PipelineResult(
+        pipeline=config.name,
+        flac_path=str(flac),
+        asr_model=config.transcribe_model,
+        rewrite_model=config.rewrite_model,
+        raw_transcript=raw,
+        rewritten_text=rewritten,
+        transcribe_seconds=asr_timer.request_seconds,
+        rewrite_seconds=rewrite_timer.request_seconds,
+        total_seconds=time.perf_counter() - start_total,
+        audio_seconds=flac_duration_seconds(flac),
+        upload_bytes=flac.stat().st_size,
+        transcribe_queue_seconds=asr_timer.queue_seconds,
+        rewrite_queue_seconds=rewrite_timer.queue_seconds,
+        request_retries=asr_timer.retries + rewrite_timer.retries,
+        transcribe_usage=asr_usage,
+        rewrite_usage=rewrite_usage,
+        rewrite_protocol=config.rewrite_protocol,
+        rewrite_edits=edits,
+        rewrite_fallback=fallback,
+    ).update_derived_metrics(
+        transcribe_pricing=config.transcribe_pricing or {},
+        rewrite_pricing=config.rewrite_pricing or {},
+    )
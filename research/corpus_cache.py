@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""Preprocessed, memory-mapped corpus cache for repeated benchmark runs.
+
+Layout of a cache directory:
+
+- `samples.i16`: every recording's preprocessed audio, packed back to back as
+  16 kHz mono int16
+- `index.json`: format info plus per-recording offset/length into the pack
+- `payloads/<format>/<name>.<ext>`: encoded upload payloads per format
+
+Building is a one-time step; readers memory-map the pack, so slicing a
+recording is zero-copy and large corpora open instantly.
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+import json
+import sys
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+import numpy as np
+
+from recording_core import SAMPLE_RATE
+
+CACHE_INDEX_NAME = "index.json"
+CACHE_SAMPLES_NAME = "samples.i16"
+CACHE_VERSION = 1
+# float <-> int16 scale, used both when packing and in `samples_float`.
+PCM_SCALE = 32767.0
+# format id -> (soundfile format, subtype, file extension)
+PAYLOAD_FORMATS = {
+    "flac": ("FLAC", "PCM_16", ".flac"),
+    "wav": ("WAV", "PCM_16", ".wav"),
+    "ogg": ("OGG", "VORBIS", ".ogg"),
+}
+
+
+@dataclass
+class CorpusEntry:
+    name: str
+    source_path: str
+    source_size: int
+    source_mtime_ns: int
+    offset: int
+    length: int
+    payloads: dict[str, str] = field(default_factory=dict)
+
+    @property
+    def seconds(self) -> float:
+        return self.length / SAMPLE_RATE
+
+
+def trim_silence(audio: np.ndarray, threshold_dbfs: float, *, frame: int = 320) -> np.ndarray:
+    """Drop leading/trailing frames whose RMS is below `threshold_dbfs`."""
+    frames = len(audio) // frame
+    if frames == 0:
+        return audio
+    rms = np.sqrt(np.mean(np.square(audio[: frames * frame].reshape(frames, frame)), axis=1))
+    loud = np.flatnonzero(rms >= 10 ** (threshold_dbfs / 20))
+    if not len(loud):
+        return audio[:0]
+    return audio[loud[0] * frame : (loud[-1] + 1) * frame]
+
+
+def build_corpus_cache(
+    flac_paths: list[Path],
+    cache_dir: Path,
+    *,
+    formats: tuple[str, ...] = ("flac",),
+    trim_threshold_dbfs: float | None = None,
+) -> list[CorpusEntry]:
+    """Decode, normalize to 16 kHz mono and pack recordings into `cache_dir`.
+
+    Recordings are processed one at a time, so memory use is bounded by the
+    largest single recording rather than the corpus. Recordings left empty
+    (e.g. all silence after trimming) are skipped and listed under `skipped`
+    in the index; they would only produce payloads no provider accepts.
+    """
+    import soundfile as sf
+
+    from audio_dsp import downmix, resample
+
+    unknown = [fmt for fmt in formats if fmt not in PAYLOAD_FORMATS]
+    if unknown:
+        raise ValueError(f"Unknown payload format(s): {', '.join(unknown)}")
+    cache_dir.mkdir(parents=True, exist_ok=True)
+
+    entries: list[CorpusEntry] = []
+    skipped: list[str] = []
+    used_names: set[str] = set()
+    offset = 0
+    with (cache_dir / CACHE_SAMPLES_NAME).open("wb") as pack:
+        for path in flac_paths:
+            audio, rate = sf.read(str(path), dtype="float32", always_2d=True)
+            audio = resample(downmix(audio), rate, SAMPLE_RATE)
+            if trim_threshold_dbfs is not None:
+                audio = trim_silence(audio, trim_threshold_dbfs)
+            if not len(audio):
+                skipped.append(str(path))
+                continue
+            pcm = np.clip(np.round(audio * PCM_SCALE), -32768, 32767).astype("<i2")
+            pack.write(pcm.tobytes())
+
+            name = path.stem
+            suffix = 1
+            while name in used_names:
+                suffix += 1
+                name = f"{path.stem}-{suffix}"
+            used_names.add(name)
+
+            payloads: dict[str, str] = {}
+            for fmt in formats:
+                sf_format, subtype, ext = PAYLOAD_FORMATS[fmt]
+                relative = Path("payloads") / fmt / f"{name}{ext}"
+                (cache_dir / relative).parent.mkdir(parents=True, exist_ok=True)
+                sf.write(str(cache_dir / relative), pcm, SAMPLE_RATE, format=sf_format, subtype=subtype)
+                payloads[fmt] = relative.as_posix()
+
+            stat = path.stat()
+            entries.append(
+                CorpusEntry(
+                    name=name,
+                    source_path=str(path),
+                    source_size=stat.st_size,
+                    source_mtime_ns=stat.st_mtime_ns,
+                    offset=offset,
+                    length=len(pcm),
+                    payloads=payloads,
+                )
+            )
+            offset += len(pcm)
+
+    index = {
+        "version": CACHE_VERSION,
+        "created_at": dt.datetime.now(dt.timezone.utc).isoformat(),
+        "sample_rate": SAMPLE_RATE,
+        "channels": 1,
+        "dtype": "int16",
+        "total_samples": offset,
+        "trim_threshold_dbfs": trim_threshold_dbfs,
+        "formats": list(formats),
+        "entries": [asdict(entry) for entry in entries],
+        "skipped": skipped,
+    }
+    (cache_dir / CACHE_INDEX_NAME).write_text(json.dumps(index, indent=2), encoding="utf-8")
+    return entries
+
+
+class CorpusCache:
+    """Read-only view of a built corpus cache.
+
+    Opening warns on stderr when source recordings changed or disappeared
+    since the build (see `stale_entries`); rebuild the cache to pick them up.
+    """
+
+    def __init__(self, cache_dir: str | Path, *, warn_stale: bool = True):
+        self.cache_dir = Path(cache_dir).expanduser().resolve()
+        index_path = self.cache_dir / CACHE_INDEX_NAME
+        if not index_path.exists():
+            raise FileNotFoundError(f"Corpus cache index not found: {index_path}")
+        index = json.loads(index_path.read_text(encoding="utf-8"))
+        if index.get("version") != CACHE_VERSION:
+            raise ValueError(f"Unsupported corpus cache version: {index.get('version')}")
+        self.sample_rate = int(index["sample_rate"])
+        self.formats: list[str] = list(index["formats"])
+        self.entries = [CorpusEntry(**entry) for entry in index["entries"]]
+        total = int(index["total_samples"])
+        if total:
+            self._samples = np.memmap(
+                self.cache_dir / CACHE_SAMPLES_NAME, dtype="<i2", mode="r", shape=(total,)
+            )
+        else:
+            self._samples = np.zeros(0, dtype="<i2")
+        if warn_stale:
+            stale = self.stale_entries()
+            if stale:
+                print(
+                    f"Warning: {len(stale)} source recording(s) changed since {self.cache_dir} "
+                    f"was built (e.g. {stale[0].source_path}); rebuild it with "
+                    "build_corpus_cache.py.",
+                    file=sys.stderr,
+                )
+
+    def stale_entries(self) -> list[CorpusEntry]:
+        """Entries whose source file is missing or has a different size or mtime."""
+        stale: list[CorpusEntry] = []
+        for entry in self.entries:
+            try:
+                stat = Path(entry.source_path).stat()
+            except OSError:
+                stale.append(entry)
+                continue
+            if (stat.st_size, stat.st_mtime_ns) != (entry.source_size, entry.source_mtime_ns):
+                stale.append(entry)
+        return stale
+
+    def samples(self, entry: CorpusEntry) -> np.ndarray:
+        """Zero-copy int16 view of one recording."""
+        return self._samples[entry.offset : entry.offset + entry.length]
+
+    def samples_float(self, entry: CorpusEntry) -> np.ndarray:
+        return self.samples(entry).astype(np.float32) / PCM_SCALE
+
+    def payload_path(self, entry: CorpusEntry, fmt: str = "flac") -> Path:
+        relative = entry.payloads.get(fmt)
+        if relative is None:
+            raise KeyError(f"Corpus cache has no {fmt!r} payload for {entry.name}")
+        return self.cache_dir / relative
+
+    def payload_paths(self, fmt: str = "flac") -> list[Path]:
+        return [self.payload_path(entry, fmt) for entry in self.entries]
@@ -8,15 +8,28 @@ from pathlib import Path
 from typing import Any
 
 from pipeline_common import (
+    BATCH_REWRITE_MAX_CHARS,
+    BATCH_REWRITE_MAX_ITEMS,
+    BATCH_REWRITE_PROMPT,
+    EDIT_REWRITE_PROMPT,
     PipelineResult,
     REWRITE_PROMPT,
+    REWRITE_PROTOCOLS,
+    TokenUsage,
+    flac_duration_seconds,
+    parse_token_usage,
     post_multipart_transcription,
     requests_post,
+    rewrite_in_batches,
+    rewrite_with_edits,
     validate_flac_path,
 )
+from rate_limit import StageTimer
+from tracing import span
 
-GROQ_TRANSCRIBE_URL = "https://api.groq.com/openai/v1/audio/transcriptions"
-GROQ_CHAT_URL = "https://api.groq.com/openai/v1/chat/completions"
+GROQ_BASE_URL = "https://api.groq.com/openai/v1"
+GROQ_TRANSCRIBE_PATH = "/audio/transcriptions"
+GROQ_CHAT_PATH = "/chat/completions"
 GROQ_TRANSCRIBE_MODEL = "whisper-large-v3"
 GROQ_REWRITE_MODEL = "moonshotai/kimi-k2-instruct"
 GROQ_REWRITE_TEMPERATURE = 0.0
@@ -47,26 +60,39 @@ def _parse_chat_completion_output(payload: dict[str, Any]) -> str:
     raise ValueError("Unable to parse chat completion text.")
 
 
-def _groq_rewrite(*, api_key: str, transcript: str, timeout_seconds: float) -> str:
-    payload = {
+def _groq_rewrite(
+    *,
+    api_key: str,
+    transcript: str,
+    timeout_seconds: float,
+    base_url: str = GROQ_BASE_URL,
+    instructions: str = REWRITE_PROMPT,
+    json_mode: bool = False,
+) -> tuple[str, TokenUsage]:
+    payload: dict[str, Any] = {
         "model": GROQ_REWRITE_MODEL,
         "temperature": GROQ_REWRITE_TEMPERATURE,
         "messages": [
-            {"role": "system", "content": REWRITE_PROMPT},
+            {"role": "system", "content": instructions},
             {"role": "user", "content": transcript},
         ],
     }
-    response = requests_post(
-        GROQ_CHAT_URL,
-        headers={
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json",
-        },
-        json=payload,
-        timeout=timeout_seconds,
-    )
-    response.raise_for_status()
-    return _parse_chat_completion_output(response.json())
+    if json_mode:
+        payload["response_format"] = {"type": "json_object"}
+    with span("rewrite.request", model=GROQ_REWRITE_MODEL, chars=len(transcript)):
+        response = requests_post(
+            f"{base_url.rstrip('/')}{GROQ_CHAT_PATH}",
+            headers={
+                "Authorization": f"Bearer {api_key}",
+                "Content-Type": "application/json",
+            },
+            json=payload,
+            timeout=timeout_seconds,
+        )
+        response.raise_for_status()
+    with span("rewrite.parse"):
+        response_payload = response.json()
+        return _parse_chat_completion_output(response_payload), parse_token_usage(response_payload)
 
 
 def run_groq_pipeline_from_flac(
@@ -74,39 +100,168 @@ def run_groq_pipeline_from_flac(
     *,
     groq_api_key: str,
     timeout_seconds: float = 180.0,
+    base_url: str = GROQ_BASE_URL,
+    rewrite_protocol: str = "full",
 ) -> PipelineResult:
+    """Transcribe then rewrite one FLAC.
+
+    With `rewrite_protocol="edits"` the rewrite model returns edits against
+    the raw transcript, applied locally with a full-rewrite fallback.
+    """
+    if rewrite_protocol not in REWRITE_PROTOCOLS:
+        raise ValueError(f"Unknown rewrite protocol: {rewrite_protocol}")
     if not groq_api_key:
         raise ValueError("Missing Groq API key.")
     flac = validate_flac_path(flac_path)
 
     start_total = time.perf_counter()
 
-    start_asr = time.perf_counter()
-    raw = post_multipart_transcription(
-        url=GROQ_TRANSCRIBE_URL,
-        api_key=groq_api_key,
-        model=GROQ_TRANSCRIBE_MODEL,
-        flac_path=flac,
-        timeout_seconds=timeout_seconds,
-    )
-    asr_seconds = time.perf_counter() - start_asr
+    with StageTimer() as asr_timer:
+        raw, asr_usage = post_multipart_transcription(
+            url=f"{base_url.rstrip('/')}{GROQ_TRANSCRIBE_PATH}",
+            api_key=groq_api_key,
+            model=GROQ_TRANSCRIBE_MODEL,
+            flac_path=flac,
+            timeout_seconds=timeout_seconds,
+        )
 
-    start_rw = time.perf_counter()
-    rewritten = _groq_rewrite(
-        api_key=groq_api_key,
-        transcript=raw,
-        timeout_seconds=timeout_seconds,
-    )
-    rewrite_seconds = time.perf_counter() - start_rw
+    edits = 0
+    fallback = False
+    with StageTimer() as rewrite_timer:
+        if rewrite_protocol == "edits":
+            outcome = rewrite_with_edits(
+                raw,
+                rewrite_edits=lambda transcript: _groq_rewrite(
+                    api_key=groq_api_key,
+                    transcript=transcript,
+                    timeout_seconds=timeout_seconds,
+                    base_url=base_url,
+                    instructions=EDIT_REWRITE_PROMPT,
+                    json_mode=True,
+                ),
+                rewrite_full=lambda transcript: _groq_rewrite(
+                    api_key=groq_api_key,
+                    transcript=transcript,
+                    timeout_seconds=timeout_seconds,
+                    base_url=base_url,
+                ),
+            )
+            rewritten, rewrite_usage = outcome.text, outcome.usage
+            edits, fallback = outcome.edits, outcome.fallback
+        else:
+            rewritten, rewrite_usage = _groq_rewrite(
+                api_key=groq_api_key,
+                transcript=raw,
+                timeout_seconds=timeout_seconds,
+                base_url=base_url,
+            )
 
     return PipelineResult(
-        pipeline="groq",
+        pipeline="groq" if rewrite_protocol == "full" else f"groq-{rewrite_protocol}",
         flac_path=str(flac),
         asr_model=GROQ_TRANSCRIBE_MODEL,
         rewrite_model=GROQ_REWRITE_MODEL,
         raw_transcript=raw,
         rewritten_text=rewritten,
-        transcribe_seconds=asr_seconds,
-        rewrite_seconds=rewrite_seconds,
+        transcribe_seconds=asr_timer.request_seconds,
+        rewrite_seconds=rewrite_timer.request_seconds,
         total_seconds=time.perf_counter() - start_total,
+        audio_seconds=flac_duration_seconds(flac),
+        upload_bytes=flac.stat().st_size,
+        transcribe_queue_seconds=asr_timer.queue_seconds,
+        rewrite_queue_seconds=rewrite_timer.queue_seconds,
+        request_retries=asr_timer.retries + rewrite_timer.retries,
+        transcribe_usage=asr_usage,
+        rewrite_usage=rewrite_usage,
+        rewrite_protocol=rewrite_protocol,
+        rewrite_edits=edits,
+        rewrite_fallback=fallback,
+    ).update_derived_metrics()
+
+
+def run_groq_pipeline_batch_from_flacs(
+    flac_paths: list[str | Path],
+    *,
+    groq_api_key: str,
+    timeout_seconds: float = 180.0,
+    base_url: str = GROQ_BASE_URL,
+    max_batch_items: int = BATCH_REWRITE_MAX_ITEMS,
+    max_batch_chars: int = BATCH_REWRITE_MAX_CHARS,
+) -> list[PipelineResult | Exception]:
+    """Transcribe each FLAC, then rewrite all transcripts in packed batches.
+
+    Returns one entry per input path, in order: a PipelineResult, or the
+    exception that stopped that file.
+    """
+    if not groq_api_key:
+        raise ValueError("Missing Groq API key.")
+
+    entries: list[PipelineResult | Exception] = []
+    pending: list[int] = []
+    for flac_path in flac_paths:
+        try:
+            flac = validate_flac_path(flac_path)
+            with StageTimer() as asr_timer:
+                raw, asr_usage = post_multipart_transcription(
+                    url=f"{base_url.rstrip('/')}{GROQ_TRANSCRIBE_PATH}",
+                    api_key=groq_api_key,
+                    model=GROQ_TRANSCRIBE_MODEL,
+                    flac_path=flac,
+                    timeout_seconds=timeout_seconds,
+                )
+        except Exception as exc:  # noqa: BLE001
+            entries.append(exc)
+            continue
+        pending.append(len(entries))
+        entries.append(
+            PipelineResult(
+                pipeline="groq",
+                flac_path=str(flac),
+                asr_model=GROQ_TRANSCRIBE_MODEL,
+                rewrite_model=GROQ_REWRITE_MODEL,
+                raw_transcript=raw,
+                rewritten_text="",
+                transcribe_seconds=asr_timer.request_seconds,
+                rewrite_seconds=0.0,
+                total_seconds=asr_timer.request_seconds,
+                audio_seconds=flac_duration_seconds(flac),
+                upload_bytes=flac.stat().st_size,
+                transcribe_queue_seconds=asr_timer.queue_seconds,
+                request_retries=asr_timer.retries,
+                transcribe_usage=asr_usage,
+            )
+        )
+
+    outcomes = rewrite_in_batches(
+        [entries[index].raw_transcript for index in pending],
+        rewrite_batch=lambda packed: _groq_rewrite(
+            api_key=groq_api_key,
+            transcript=packed,
+            timeout_seconds=timeout_seconds,
+            base_url=base_url,
+            instructions=BATCH_REWRITE_PROMPT,
+            json_mode=True,
+        ),
+        rewrite_one=lambda transcript: _groq_rewrite(
+            api_key=groq_api_key,
+            transcript=transcript,
+            timeout_seconds=timeout_seconds,
+            base_url=base_url,
+        ),
+        max_items=max_batch_items,
+        max_chars=max_batch_chars,
     )
+    for index, outcome in zip(pending, outcomes):
+        if outcome.text is None:
+            entries[index] = RuntimeError(f"Rewrite failed: {outcome.error}")
+            continue
+        result = entries[index]
+        result.rewritten_text = outcome.text
+        result.rewrite_seconds = outcome.seconds
+        result.rewrite_batch_size = outcome.batch_size
+        result.total_seconds = result.transcribe_seconds + outcome.seconds
+        result.rewrite_usage = outcome.usage
+        result.rewrite_queue_seconds = outcome.queue_seconds
+        result.request_retries += outcome.retries
+        result.update_derived_metrics()
+    return entries
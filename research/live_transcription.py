@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""Speculative transcription of speech segments while recording continues.
+
+`record_flac_to_file(on_segment=...)` cuts the recording at pauses. Each
+completed segment is written as a small FLAC and transcribed in the
+background by one `LiveSegmentTranscriber` per pipeline; at stop only the
+final segment is still outstanding, and the partial transcripts are joined
+in spoken order.
+"""
+
+from __future__ import annotations
+
+import time
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from pipeline_common import TokenUsage
+from recording_core import SAMPLE_RATE
+from tracing import span
+
+LIVE_MAX_WORKERS = 4
+
+
+def write_segment_flac(audio, path: Path) -> int:
+    """Encode one 16 kHz mono segment; returns the file size in bytes."""
+    import soundfile as sf
+
+    with span("live.encode_segment", samples=len(audio)):
+        sf.write(str(path), audio, SAMPLE_RATE, format="FLAC", subtype="PCM_16")
+    return path.stat().st_size
+
+
+@dataclass
+class LiveTranscript:
+    text: str
+    usage: TokenUsage
+    segments: int
+    upload_bytes: int
+    # How long `result()` waited for outstanding segments.
+    wait_seconds: float
+    segment_seconds: list[float] = field(default_factory=list)
+
+
+class LiveSegmentTranscriber:
+    """Transcribes segments as they are submitted; `result()` joins them in order."""
+
+    def __init__(
+        self,
+        transcribe: Callable[[Path], tuple[str, TokenUsage]],
+        *,
+        max_workers: int = LIVE_MAX_WORKERS,
+    ):
+        self._transcribe = transcribe
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="live-asr")
+        self._futures: dict[int, Future | None] = {}
+        self._upload_bytes = 0
+
+    def _run(self, index: int, path: Path) -> tuple[str, TokenUsage, float]:
+        start = time.perf_counter()
+        with span("live.transcribe_segment", segment=index):
+            text, usage = self._transcribe(path)
+        return text, usage, time.perf_counter() - start
+
+    def submit(self, index: int, path: Path | None) -> None:
+        """Queue segment `index`; `path=None` marks a segment without speech."""
+        if path is None:
+            self._futures[index] = None
+            return
+        self._upload_bytes += path.stat().st_size
+        self._futures[index] = self._executor.submit(self._run, index, path)
+
+    def fail(self, index: int, exc: BaseException) -> None:
+        """Mark segment `index` as failed so `result()` raises and callers fall back."""
+        future: Future = Future()
+        future.set_exception(exc)
+        self._futures[index] = future
+
+    def result(self) -> LiveTranscript:
+        """Wait for every submitted segment; raises if any segment failed."""
+        start = time.perf_counter()
+        pieces: list[str] = []
+        usage = TokenUsage()
+        segment_seconds: list[float] = []
+        try:
+            for index in sorted(self._futures):
+                future = self._futures[index]
+                if future is None:
+                    continue
+                text, segment_usage, seconds = future.result()
+                pieces.append(text.strip())
+                usage = usage + segment_usage
+                segment_seconds.append(seconds)
+        finally:
+            self.close()
+        return LiveTranscript(
+            text=" ".join(piece for piece in pieces if piece),
+            usage=usage,
+            segments=len(segment_seconds),
+            upload_bytes=self._upload_bytes,
+            wait_seconds=time.perf_counter() - start,
+            segment_seconds=segment_seconds,
+        )
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
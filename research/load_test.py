@@ -0,0 +1,475 @@
+#!/usr/bin/env python3
+"""Utility: closed-loop load generator simulating concurrent dictation users.
+
+Each simulated user replays FLAC files from a corpus through a pipeline,
+waits for the result, then waits according to the arrival pattern before
+sending the next dictation:
+
+- closed: send the next dictation immediately
+- poisson: exponential think time (Poisson arrivals per user)
+- burst: all users fire together on fixed burst boundaries
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime as dt
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from env_utils import load_dotenv
+from pipeline_common import collect_flac_paths, flac_duration_seconds, http_status_code
+from pipeline_runner_core import (
+    DEFAULT_PIPELINE_IDS,
+    available_pipelines_text,
+    register_pipeline_configs,
+    resolve_pipelines,
+    run_pipeline,
+)
+from rate_limit import DEFAULT_MAX_RETRIES, StageTimer, configure_scheduler
+from tracing import enable_tracing, export_chrome_trace, span
+
+ARRIVAL_PATTERNS = ("closed", "poisson", "burst")
+
+
+@dataclass
+class LoadSample:
+    pipeline: str
+    concurrency: int
+    user: int
+    flac_path: str
+    started_seconds: float
+    latency_seconds: float
+    audio_seconds: float
+    ok: bool
+    queue_seconds: float = 0.0
+    retries: int = 0
+    # 429 responses seen by the scheduler, including ones it retried.
+    rate_limited: int = 0
+    status_code: int | None = None
+    error: str | None = None
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Load-test speech pipelines with simulated users.")
+    parser.add_argument(
+        "inputs",
+        nargs="*",
+        help="FLAC files and/or directories containing .flac files to replay.",
+    )
+    parser.add_argument(
+        "--corpus-cache",
+        default=None,
+        help="Replay the cached FLAC payloads of a corpus built with build_corpus_cache.py.",
+    )
+    parser.add_argument(
+        "--pipelines",
+        nargs="+",
+        default=list(DEFAULT_PIPELINE_IDS),
+        help="Pipeline ids to load. Each pipeline is tested separately.",
+    )
+    parser.add_argument(
+        "--list-pipelines",
+        action="store_true",
+        help="List available pipeline ids and exit.",
+    )
+    parser.add_argument(
+        "--pipelines-config",
+        default=None,
+        help=(
+            "JSON file defining extra OpenAI-compatible pipelines (default: "
+            "$YADA_PIPELINES_CONFIG, else ./pipelines.json if present)."
+        ),
+    )
+    parser.add_argument(
+        "--concurrency",
+        nargs="+",
+        type=int,
+        default=[1, 2, 4, 8],
+        help="Simulated user counts to step through (default: 1 2 4 8).",
+    )
+    parser.add_argument(
+        "--arrival",
+        choices=ARRIVAL_PATTERNS,
+        default="poisson",
+        help="Arrival pattern per user (default: poisson).",
+    )
+    parser.add_argument(
+        "--think-seconds",
+        type=float,
+        default=5.0,
+        help="Mean think time between a user's dictations for --arrival poisson.",
+    )
+    parser.add_argument(
+        "--burst-interval-seconds",
+        type=float,
+        default=10.0,
+        help="Seconds between bursts for --arrival burst.",
+    )
+    parser.add_argument(
+        "--duration-seconds",
+        type=float,
+        default=60.0,
+        help="How long each concurrency step keeps starting new dictations.",
+    )
+    parser.add_argument(
+        "--window-seconds",
+        type=float,
+        default=10.0,
+        help="Bucket size for the latency/throughput time series.",
+    )
+    parser.add_argument(
+        "--openai-base-url",
+        default=None,
+        help="Override the OpenAI API base URL (e.g. a local stand-in server).",
+    )
+    parser.add_argument(
+        "--groq-base-url",
+        default=None,
+        help="Override the Groq API base URL (e.g. a local stand-in server).",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=None,
+        help="Random seed for think times and start offsets.",
+    )
+    parser.add_argument(
+        "--timeout-seconds",
+        type=float,
+        default=180.0,
+        help="Per-request timeout.",
+    )
+    parser.add_argument(
+        "--rate-limit",
+        action="append",
+        default=[],
+        metavar="PROVIDER[/MODEL]=RPM[:BURST]",
+        help="Pace requests with a token bucket, e.g. groq=30 or openai/gpt-5-mini=500:10 (repeatable).",
+    )
+    parser.add_argument(
+        "--max-retries",
+        type=int,
+        default=DEFAULT_MAX_RETRIES,
+        help=(
+            "Retries per request on 429/5xx/connection errors, honouring Retry-After "
+            f"(default: {DEFAULT_MAX_RETRIES})."
+        ),
+    )
+    parser.add_argument(
+        "--output-dir",
+        default="runs",
+        help="Directory for JSON result artifacts.",
+    )
+    parser.add_argument(
+        "--trace-file",
+        default=None,
+        help="Record stage spans and write a Chrome trace-event JSON file (open in Perfetto).",
+    )
+    return parser.parse_args()
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Nearest-rank percentile; 0.0 for an empty list."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(math.ceil(q / 100.0 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def _latency_stats(samples: list[LoadSample], attr: str = "latency_seconds") -> dict:
+    latencies = [getattr(sample, attr) for sample in samples if sample.ok]
+    return {
+        "p50": percentile(latencies, 50),
+        "p90": percentile(latencies, 90),
+        "p99": percentile(latencies, 99),
+        "max": max(latencies, default=0.0),
+    }
+
+
+def _was_rate_limited(sample: LoadSample) -> bool:
+    return sample.rate_limited > 0 or sample.status_code == 429
+
+
+def summarize_samples(samples: list[LoadSample], wall_seconds: float, window_seconds: float) -> dict:
+    ok = [sample for sample in samples if sample.ok]
+    rate_limited = sum(1 for sample in samples if _was_rate_limited(sample))
+    errors = len(samples) - len(ok)
+    summary = {
+        "requests": len(samples),
+        "completed": len(ok),
+        "errors": errors,
+        # Requests that hit at least one 429, and the total 429 responses.
+        "rate_limited": rate_limited,
+        "rate_limited_responses": sum(sample.rate_limited for sample in samples),
+        "error_rate": errors / len(samples) if samples else 0.0,
+        "rate_limited_rate": rate_limited / len(samples) if samples else 0.0,
+        "wall_seconds": wall_seconds,
+        "throughput_rps": len(ok) / wall_seconds if wall_seconds > 0 else 0.0,
+        "audio_seconds_per_second": (
+            sum(sample.audio_seconds for sample in ok) / wall_seconds if wall_seconds > 0 else 0.0
+        ),
+        "latency_seconds": _latency_stats(samples),
+        # Scheduler wait (pacing, Retry-After, backoff) included in latency.
+        "queue_seconds": _latency_stats(samples, "queue_seconds"),
+        "retries": sum(sample.retries for sample in samples),
+        "windows": [],
+    }
+
+    window_count = max(math.ceil(wall_seconds / window_seconds), 1)
+    for index in range(window_count):
+        start = index * window_seconds
+        in_window = [
+            sample
+            for sample in samples
+            if start <= sample.started_seconds + sample.latency_seconds < start + window_seconds
+        ]
+        summary["windows"].append(
+            {
+                "start_seconds": start,
+                "completed": sum(1 for sample in in_window if sample.ok),
+                "errors": sum(1 for sample in in_window if not sample.ok),
+                "rate_limited": sum(1 for sample in in_window if _was_rate_limited(sample)),
+                "throughput_rps": sum(1 for sample in in_window if sample.ok) / window_seconds,
+                "latency_seconds": _latency_stats(in_window),
+            }
+        )
+    return summary
+
+
+def run_load_step(
+    *,
+    pipeline: str,
+    concurrency: int,
+    flac_paths: list[Path],
+    args: argparse.Namespace,
+    openai_api_key: str,
+    groq_api_key: str,
+    base_urls: dict[str, str],
+    rng: random.Random,
+) -> tuple[list[LoadSample], float]:
+    samples: list[LoadSample] = []
+    lock = threading.Lock()
+    next_file = [0]
+    durations = {path: flac_duration_seconds(path) for path in flac_paths}
+    step_start = time.perf_counter()
+    deadline = step_start + args.duration_seconds
+    # Per-user seeds keep runs reproducible with --seed despite thread scheduling.
+    user_seeds = [rng.random() for _ in range(concurrency)]
+
+    def wait_before_next(user_rng: random.Random, first: bool) -> None:
+        now = time.perf_counter()
+        if args.arrival == "poisson":
+            delay = user_rng.expovariate(1.0 / args.think_seconds) if args.think_seconds > 0 else 0.0
+        elif args.arrival == "burst":
+            elapsed = now - step_start
+            boundary = 0.0 if first else math.ceil(elapsed / args.burst_interval_seconds)
+            delay = max(boundary * args.burst_interval_seconds - elapsed, 0.0)
+        else:
+            delay = 0.0
+        time.sleep(max(min(delay, deadline - now), 0.0))
+
+    def user_loop(user: int) -> None:
+        user_rng = random.Random(user_seeds[user])
+        first = True
+        while True:
+            wait_before_next(user_rng, first)
+            first = False
+            if time.perf_counter() >= deadline:
+                return
+            with lock:
+                flac = flac_paths[next_file[0] % len(flac_paths)]
+                next_file[0] += 1
+            started = time.perf_counter()
+            timer = StageTimer()
+            try:
+                with timer:
+                    run_pipeline(
+                        pipeline,
+                        flac,
+                        timeout_seconds=args.timeout_seconds,
+                        openai_api_key=openai_api_key,
+                        groq_api_key=groq_api_key,
+                        base_urls=base_urls,
+                    )
+                sample = LoadSample(
+                    pipeline=pipeline,
+                    concurrency=concurrency,
+                    user=user,
+                    flac_path=str(flac),
+                    started_seconds=started - step_start,
+                    latency_seconds=time.perf_counter() - started,
+                    audio_seconds=durations[flac],
+                    ok=True,
+                    queue_seconds=timer.queue_seconds,
+                    retries=timer.retries,
+                    rate_limited=timer.rate_limited,
+                )
+            except Exception as exc:  # noqa: BLE001
+                sample = LoadSample(
+                    pipeline=pipeline,
+                    concurrency=concurrency,
+                    user=user,
+                    flac_path=str(flac),
+                    started_seconds=started - step_start,
+                    latency_seconds=time.perf_counter() - started,
+                    audio_seconds=durations[flac],
+                    ok=False,
+                    queue_seconds=timer.queue_seconds,
+                    retries=timer.retries,
+                    rate_limited=timer.rate_limited,
+                    status_code=http_status_code(exc),
+                    error=str(exc),
+                )
+            with lock:
+                samples.append(sample)
+
+    threads = [
+        threading.Thread(target=user_loop, args=(user,), name=f"load-user-{user}", daemon=True)
+        for user in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples, time.perf_counter() - step_start
+
+
+def print_step_summary(pipeline: str, concurrency: int, summary: dict) -> None:
+    latency = summary["latency_seconds"]
+    print(
+        f"[{pipeline}] users={concurrency} done={summary['completed']}/{summary['requests']} "
+        f"rps={summary['throughput_rps']:.2f} audio_x={summary['audio_seconds_per_second']:.1f} "
+        f"p50={latency['p50']:.2f}s p90={latency['p90']:.2f}s p99={latency['p99']:.2f}s "
+        f"err={summary['error_rate']:.1%} 429={summary['rate_limited_rate']:.1%} "
+        f"queue_p90={summary['queue_seconds']['p90']:.2f}s retries={summary['retries']}"
+    )
+
+
+def write_results_json(
+    *,
+    args: argparse.Namespace,
+    selected: list[str],
+    flac_paths: list[Path],
+    steps: list[dict],
+    samples: list[LoadSample],
+) -> Path:
+    output_dir = Path(args.output_dir).expanduser().resolve()
+    output_dir.mkdir(parents=True, exist_ok=True)
+    stamp = dt.datetime.now().strftime("%Y%m%d-%H%M%S")
+    output_path = output_dir / f"load-test-{stamp}.json"
+    payload = {
+        "created_at": dt.datetime.now(dt.timezone.utc).isoformat(),
+        "pipelines": selected,
+        "arrival": args.arrival,
+        "think_seconds": args.think_seconds,
+        "burst_interval_seconds": args.burst_interval_seconds,
+        "duration_seconds": args.duration_seconds,
+        "base_urls": {"openai": args.openai_base_url, "groq": args.groq_base_url},
+        "rate_limits": args.rate_limit,
+        "max_retries": args.max_retries,
+        "source_flacs": [str(path) for path in flac_paths],
+        "steps": steps,
+        "samples": [asdict(sample) for sample in samples],
+    }
+    output_path.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+    return output_path
+
+
+def main() -> int:
+    args = parse_args()
+    if args.trace_file:
+        enable_tracing()
+    try:
+        register_pipeline_configs(args.pipelines_config)
+    except Exception as exc:  # noqa: BLE001
+        print(f"Pipelines config error: {exc}", file=sys.stderr)
+        return 2
+    try:
+        configure_scheduler(rate_limits=args.rate_limit, max_retries=args.max_retries)
+    except ValueError as exc:
+        print(f"Input error: {exc}", file=sys.stderr)
+        return 2
+    if args.list_pipelines:
+        print(available_pipelines_text())
+        return 0
+
+    flac_paths = collect_flac_paths(args.inputs)
+    if args.corpus_cache:
+        from corpus_cache import CorpusCache
+
+        try:
+            flac_paths.extend(CorpusCache(args.corpus_cache).payload_paths("flac"))
+        except Exception as exc:  # noqa: BLE001
+            print(f"Corpus cache error: {exc}", file=sys.stderr)
+            return 2
+    if not flac_paths:
+        print("No .flac inputs found.", file=sys.stderr)
+        return 2
+    if any(level < 1 for level in args.concurrency):
+        print("--concurrency values must be positive.", file=sys.stderr)
+        return 2
+    if args.duration_seconds <= 0 or args.window_seconds <= 0 or args.burst_interval_seconds <= 0:
+        print("Durations and intervals must be positive.", file=sys.stderr)
+        return 2
+
+    try:
+        selected = resolve_pipelines(args.pipelines)
+    except Exception as exc:  # noqa: BLE001
+        print(f"Input error: {exc}", file=sys.stderr)
+        return 2
+
+    project_root = Path(__file__).resolve().parents[1]
+    load_dotenv([Path.cwd() / ".env", project_root / ".env"])
+    openai_api_key = os.getenv("OPENAI_API_KEY", "")
+    groq_api_key = os.getenv("GROQ_API_KEY", "")
+    base_urls = {}
+    if args.openai_base_url:
+        base_urls["openai"] = args.openai_base_url
+    if args.groq_base_url:
+        base_urls["groq"] = args.groq_base_url
+
+    rng = random.Random(args.seed)
+    steps: list[dict] = []
+    all_samples: list[LoadSample] = []
+    for pipeline in selected:
+        for concurrency in args.concurrency:
+            samples, wall_seconds = run_load_step(
+                pipeline=pipeline,
+                concurrency=concurrency,
+                flac_paths=flac_paths,
+                args=args,
+                openai_api_key=openai_api_key,
+                groq_api_key=groq_api_key,
+                base_urls=base_urls,
+                rng=rng,
+            )
+            summary = summarize_samples(samples, wall_seconds, args.window_seconds)
+            print_step_summary(pipeline, concurrency, summary)
+            steps.append({"pipeline": pipeline, "concurrency": concurrency, **summary})
+            all_samples.extend(samples)
+
+    with span("artifact.write"):
+        output_path = write_results_json(
+            args=args,
+            selected=selected,
+            flac_paths=flac_paths,
+            steps=steps,
+            samples=all_samples,
+        )
+    print(f"\nSaved results: {output_path}")
+    if args.trace_file:
+        print(f"Saved trace: {export_chrome_trace(args.trace_file)}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,548 @@
+#!/usr/bin/env python3
+"""Utility: microbenchmarks for the local CPU hot paths, with stored baselines.
+
+Each case is timed at several audio lengths after a warm-up. Every sample
+runs the case enough times to last at least `--min-sample-seconds`; the
+median per-call time is compared against a stored baseline and the run fails
+(exit code 1) when any case is slower than baseline by more than
+`--tolerance`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+import numpy as np
+
+from audio_dsp import PolyphaseResampler, downmix, resample
+from corpus_cache import CorpusCache
+from recording_core import SAMPLE_RATE
+
+DEFAULT_BASELINE = "benchmarks/microbench-baseline.json"
+DEFAULT_AUDIO_SECONDS = (5.0, 30.0, 120.0)
+DEFAULT_TOLERANCE = 0.25
+# Capture format the recording cases simulate (a typical native device).
+CAPTURE_RATE = 48000
+CAPTURE_CHANNELS = 2
+CALLBACK_FRAMES = 512
+# Rough dictation speed, used to size transcripts for a given audio length.
+WORDS_PER_SECOND = 2.5
+ARTIFACT_RESULTS = 20
+
+
+@dataclass
+class CaseStats:
+    name: str
+    audio_seconds: float
+    loops: int
+    samples: int
+    median_seconds: float
+    min_seconds: float
+    mean_seconds: float
+    stdev_seconds: float
+    iqr_seconds: float
+
+    @property
+    def key(self) -> str:
+        return f"{self.name}[{self.audio_seconds:g}s]"
+
+
+# Set from --corpus-cache: audio cases then run on recorded speech.
+_corpus: CorpusCache | None = None
+# Scratch directory for cases that write files; created and removed by main().
+_scratch_dir: Path | None = None
+
+
+def _scratch_path(name: str) -> Path:
+    if _scratch_dir is None:
+        raise RuntimeError("Benchmark scratch directory is not set up.")
+    return _scratch_dir / name
+
+
+def _corpus_audio(seconds: float) -> np.ndarray | None:
+    """`seconds` of 16 kHz float audio sliced from the cache pack, looping the corpus."""
+    if _corpus is None:
+        return None
+    needed = int(SAMPLE_RATE * seconds)
+    pieces: list[np.ndarray] = []
+    total = 0
+    while total < needed:
+        for entry in _corpus.entries:
+            piece = _corpus.samples(entry)[: needed - total]
+            pieces.append(piece)
+            total += len(piece)
+            if total >= needed:
+                break
+    return np.concatenate(pieces).astype(np.float32) / 32768.0
+
+
+def _capture_blocks(seconds: float) -> list[np.ndarray]:
+    corpus = _corpus_audio(seconds)
+    if corpus is not None:
+        mono = resample(corpus, SAMPLE_RATE, CAPTURE_RATE)
+        audio = np.repeat(mono[:, None], CAPTURE_CHANNELS, axis=1)
+    else:
+        rng = np.random.default_rng(0)
+        audio = (
+            rng.standard_normal((int(CAPTURE_RATE * seconds), CAPTURE_CHANNELS)) * 0.1
+        ).astype(np.float32)
+    return [audio[i : i + CALLBACK_FRAMES] for i in range(0, len(audio), CALLBACK_FRAMES)]
+
+
+def _pipeline_audio(seconds: float) -> np.ndarray:
+    corpus = _corpus_audio(seconds)
+    if corpus is not None:
+        return corpus
+    # A modulated tone plus noise, so FLAC payloads are roughly speech-sized.
+    t = np.arange(int(SAMPLE_RATE * seconds)) / SAMPLE_RATE
+    noise = np.random.default_rng(1).standard_normal(len(t)) * 0.02
+    return (0.3 * np.sin(2 * np.pi * 220 * t) * np.sin(2 * np.pi * 0.5 * t) + noise).astype(
+        np.float32
+    )
+
+
+def _transcript(seconds: float) -> str:
+    words = ("so", "the", "meeting", "moved", "to", "thursday", "at", "three", "okay")
+    return " ".join(words[i % len(words)] for i in range(max(int(seconds * WORDS_PER_SECOND), 1)))
+
+
+def _flac_bytes(seconds: float) -> bytes:
+    import soundfile as sf
+
+    buffer = io.BytesIO()
+    sf.write(buffer, _pipeline_audio(seconds), SAMPLE_RATE, format="FLAC", subtype="PCM_16")
+    return buffer.getvalue()
+
+
+def case_chunk_concat(seconds: float) -> Callable[[], object]:
+    """Concatenate callback blocks into one recording (at-stop path)."""
+    blocks = _capture_blocks(seconds)
+    return lambda: np.concatenate(blocks, axis=0)
+
+
+def case_block_convert(seconds: float) -> Callable[[], object]:
+    """Downmix and resample every callback block (stream path)."""
+    blocks = _capture_blocks(seconds)
+
+    def run() -> None:
+        resampler = PolyphaseResampler(CAPTURE_RATE, SAMPLE_RATE)
+        for block in blocks:
+            resampler.process(downmix(block))
+        resampler.flush()
+
+    return run
+
+
+def case_flac_encode(seconds: float) -> Callable[[], object]:
+    """Encode a converted 16 kHz mono recording to FLAC (at-stop path)."""
+    import soundfile as sf
+
+    audio = _pipeline_audio(seconds)
+
+    def run() -> None:
+        sf.write(io.BytesIO(), audio, SAMPLE_RATE, format="FLAC", subtype="PCM_16")
+
+    return run
+
+
+def case_flac_encode_incremental(seconds: float) -> Callable[[], object]:
+    """Feed callback blocks through BackgroundFlacEncoder and close it."""
+    import soundfile as sf
+
+    from recording_core import BackgroundFlacEncoder
+
+    blocks = _capture_blocks(seconds)
+    output = _scratch_path(f"incremental-{seconds:g}s.flac")
+
+    def run() -> None:
+        resampler = PolyphaseResampler(CAPTURE_RATE, SAMPLE_RATE)
+        encoder = BackgroundFlacEncoder(
+            np, sf, output, lambda block: resampler.process(downmix(block)), resampler.flush
+        )
+        for block in blocks:
+            encoder.submit(block)
+        encoder.close()
+
+    return run
+
+
+def case_multipart_build(seconds: float) -> Callable[[], object]:
+    """Build the transcription upload exactly as `post_multipart_transcription` sends it."""
+    import requests
+
+    from pipeline_common import multipart_transcription_request
+
+    payload = _flac_bytes(seconds)
+
+    def run() -> None:
+        request = multipart_transcription_request(
+            api_key="sk-bench",
+            model="gpt-4o-transcribe",
+            flac_name="mic.flac",
+            flac_file=io.BytesIO(payload),
+        )
+        requests.Request(
+            "POST", "https://api.openai.com/v1/audio/transcriptions", **request
+        ).prepare()
+
+    return run
+
+
+def case_parse_openai_responses(seconds: float) -> Callable[[], object]:
+    """Decode a Responses API body and extract text and usage."""
+    from openai_pipeline import _parse_openai_responses_output
+    from pipeline_common import parse_token_usage
+
+    text = _transcript(seconds).capitalize() + "."
+    body = json.dumps(
+        {
+            "id": "resp_bench",
+            "output": [
+                {"type": "reasoning", "summary": []},
+                {"type": "message", "content": [{"type": "output_text", "text": text}]},
+            ],
+            "usage": {
+                "input_tokens": 400,
+                "input_tokens_details": {"cached_tokens": 256},
+                "output_tokens": len(text) // 4,
+                "output_tokens_details": {"reasoning_tokens": 64},
+            },
+        }
+    )
+
+    def run() -> None:
+        payload = json.loads(body)
+        _parse_openai_responses_output(payload)
+        parse_token_usage(payload)
+
+    return run
+
+
+def case_parse_chat_completion(seconds: float) -> Callable[[], object]:
+    """Decode a Chat Completions body and extract text and usage."""
+    from groq_pipeline import _parse_chat_completion_output
+    from pipeline_common import parse_token_usage
+
+    text = _transcript(seconds).capitalize() + "."
+    body = json.dumps(
+        {
+            "id": "chatcmpl-bench",
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}}],
+            "usage": {"prompt_tokens": 400, "completion_tokens": len(text) // 4},
+        }
+    )
+
+    def run() -> None:
+        payload = json.loads(body)
+        _parse_chat_completion_output(payload)
+        parse_token_usage(payload)
+
+    return run
+
+
+def case_artifact_write(seconds: float) -> Callable[[], object]:
+    """Aggregate results and write a run artifact the way the CLIs do."""
+    from pipeline_common import PipelineResult, TokenUsage
+    from pipeline_runner_core import aggregate_results
+
+    text = _transcript(seconds)
+    results = [
+        asdict(
+            PipelineResult(
+                pipeline=("openai", "groq")[index % 2],
+                flac_path=f"/audio/mic-{index}.flac",
+                asr_model="gpt-4o-transcribe",
+                rewrite_model="gpt-5-mini",
+                raw_transcript=text,
+                rewritten_text=text.capitalize(),
+                transcribe_seconds=1.0,
+                rewrite_seconds=1.5,
+                total_seconds=2.5,
+                audio_seconds=seconds,
+                upload_bytes=int(seconds * 20000),
+                transcribe_usage=TokenUsage(input_tokens=100, output_tokens=len(text) // 4),
+                rewrite_usage=TokenUsage(input_tokens=400, output_tokens=len(text) // 4),
+            ).update_derived_metrics()
+        )
+        for index in range(ARTIFACT_RESULTS)
+    ]
+    output = _scratch_path(f"artifact-{seconds:g}s.json")
+
+    def run() -> None:
+        payload = {"aggregates": aggregate_results(results), "results": results}
+        output.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+
+    return run
+
+
+CASES: dict[str, Callable[[float], Callable[[], object]]] = {
+    "chunk_concat": case_chunk_concat,
+    "block_convert": case_block_convert,
+    "flac_encode": case_flac_encode,
+    "flac_encode_incremental": case_flac_encode_incremental,
+    "multipart_build": case_multipart_build,
+    "parse_openai_responses": case_parse_openai_responses,
+    "parse_chat_completion": case_parse_chat_completion,
+    "artifact_write": case_artifact_write,
+}
+
+
+def _calibrate(fn: Callable[[], object], min_sample_seconds: float) -> int:
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        if time.perf_counter() - start >= min_sample_seconds:
+            return loops
+        loops *= 2
+
+
+def measure(
+    name: str,
+    fn: Callable[[], object],
+    *,
+    audio_seconds: float,
+    warmup: int,
+    repeats: int,
+    min_sample_seconds: float,
+) -> CaseStats:
+    for _ in range(warmup):
+        fn()
+    loops = _calibrate(fn, min_sample_seconds)
+    samples: list[float] = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeats):
+            start = time.perf_counter()
+            for _ in range(loops):
+                fn()
+            samples.append((time.perf_counter() - start) / loops)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    quartiles = statistics.quantiles(samples, n=4) if len(samples) > 1 else [samples[0]] * 3
+    return CaseStats(
+        name=name,
+        audio_seconds=audio_seconds,
+        loops=loops,
+        samples=len(samples),
+        median_seconds=statistics.median(samples),
+        min_seconds=min(samples),
+        mean_seconds=statistics.fmean(samples),
+        stdev_seconds=statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        iqr_seconds=quartiles[2] - quartiles[0],
+    )
+
+
+def environment_info() -> dict:
+    import soundfile as sf
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "soundfile": sf.__version__,
+        "libsndfile": sf.__libsndfile_version__,
+    }
+
+
+def compare_to_baseline(
+    stats: list[CaseStats], baseline: dict, tolerance: float
+) -> tuple[list[str], list[str]]:
+    """Return (report lines, regressed keys) for cases present in the baseline."""
+    cases = baseline.get("cases", {})
+    lines: list[str] = []
+    regressed: list[str] = []
+    for item in stats:
+        reference = cases.get(item.key)
+        if reference is None:
+            lines.append(f"  {item.key:<40} no baseline")
+            continue
+        ratio = item.median_seconds / reference["median_seconds"]
+        status = "ok"
+        if ratio > 1 + tolerance:
+            status = "REGRESSION"
+            regressed.append(item.key)
+        elif ratio < 1 - tolerance:
+            status = "faster"
+        lines.append(f"  {item.key:<40} {ratio:6.2f}x baseline  {status}")
+    return lines, regressed
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark local CPU hot paths.")
+    parser.add_argument(
+        "--cases",
+        nargs="+",
+        default=list(CASES),
+        help="Cases to run (default: all). See --list-cases.",
+    )
+    parser.add_argument(
+        "--list-cases",
+        action="store_true",
+        help="List benchmark cases and exit.",
+    )
+    parser.add_argument(
+        "--audio-seconds",
+        type=float,
+        nargs="+",
+        default=list(DEFAULT_AUDIO_SECONDS),
+        help="Audio lengths to parameterize each case by (default: 5 30 120).",
+    )
+    parser.add_argument(
+        "--warmup",
+        type=int,
+        default=3,
+        help="Untimed calls before measuring each case (default: 3).",
+    )
+    parser.add_argument(
+        "--repeats",
+        type=int,
+        default=15,
+        help="Timed samples per case (default: 15).",
+    )
+    parser.add_argument(
+        "--min-sample-seconds",
+        type=float,
+        default=0.05,
+        help="Minimum duration of one sample; fast cases loop to reach it (default: 0.05).",
+    )
+    parser.add_argument(
+        "--corpus-cache",
+        default=None,
+        help="Corpus cache (see build_corpus_cache.py) whose audio replaces the synthetic "
+        "signal in the audio cases; baselines should be saved with the same cache.",
+    )
+    parser.add_argument(
+        "--baseline",
+        default=DEFAULT_BASELINE,
+        help=f"Baseline JSON to compare against, if it exists (default: {DEFAULT_BASELINE}).",
+    )
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="Write this run's results to --baseline instead of comparing.",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=DEFAULT_TOLERANCE,
+        help="Allowed slowdown of the median vs baseline before failing (default: 0.25 = 25%%).",
+    )
+    parser.add_argument(
+        "--output-file",
+        default=None,
+        help="Optional JSON file for this run's results.",
+    )
+    return parser.parse_args()
+
+
+def main() -> int:
+    global _corpus, _scratch_dir
+    args = parse_args()
+    if args.list_cases:
+        for name, factory in CASES.items():
+            print(f"- {name}: {(factory.__doc__ or '').strip()}")
+        return 0
+    unknown = [name for name in args.cases if name not in CASES]
+    if unknown:
+        print(f"Unknown case(s): {', '.join(unknown)}", file=sys.stderr)
+        return 2
+    if args.repeats < 2 or args.warmup < 0:
+        print("--repeats must be >= 2 and --warmup >= 0.", file=sys.stderr)
+        return 2
+    if args.corpus_cache:
+        try:
+            _corpus = CorpusCache(args.corpus_cache)
+        except Exception as exc:  # noqa: BLE001
+            print(f"Corpus cache error: {exc}", file=sys.stderr)
+            return 2
+        if not any(entry.length for entry in _corpus.entries):
+            print("Corpus cache has no audio.", file=sys.stderr)
+            return 2
+
+    stats: list[CaseStats] = []
+    with tempfile.TemporaryDirectory(prefix="microbench-") as scratch:
+        _scratch_dir = Path(scratch)
+        try:
+            for name in args.cases:
+                for seconds in args.audio_seconds:
+                    item = measure(
+                        name,
+                        CASES[name](seconds),
+                        audio_seconds=seconds,
+                        warmup=args.warmup,
+                        repeats=args.repeats,
+                        min_sample_seconds=args.min_sample_seconds,
+                    )
+                    stats.append(item)
+                    print(
+                        f"{item.key:<40} median={item.median_seconds * 1000:9.3f}ms "
+                        f"min={item.min_seconds * 1000:9.3f}ms "
+                        f"iqr={item.iqr_seconds * 1000:7.3f}ms loops={item.loops}"
+                    )
+        finally:
+            _scratch_dir = None
+
+    payload = {
+        "environment": environment_info(),
+        "settings": {
+            "warmup": args.warmup,
+            "repeats": args.repeats,
+            "min_sample_seconds": args.min_sample_seconds,
+            "corpus_cache": str(_corpus.cache_dir) if _corpus is not None else None,
+        },
+        "cases": {item.key: asdict(item) for item in stats},
+    }
+    if args.output_file:
+        output = Path(args.output_file).expanduser().resolve()
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+        print(f"Saved results: {output}")
+
+    baseline_path = Path(args.baseline).expanduser().resolve()
+    if args.save_baseline:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        if baseline_path.exists():
+            # Keep cases that were not re-run this time.
+            previous = json.loads(baseline_path.read_text(encoding="utf-8"))
+            payload["cases"] = {**previous.get("cases", {}), **payload["cases"]}
+        baseline_path.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+        print(f"Saved baseline: {baseline_path}")
+        return 0
+    if not baseline_path.exists():
+        print(f"No baseline at {baseline_path}; run with --save-baseline to create one.")
+        return 0
+
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+    if baseline.get("environment") != payload["environment"]:
+        print("Warning: baseline was recorded in a different environment.", file=sys.stderr)
+    if baseline.get("settings", {}).get("corpus_cache") != payload["settings"]["corpus_cache"]:
+        print("Warning: baseline was recorded with different benchmark audio.", file=sys.stderr)
+    lines, regressed = compare_to_baseline(stats, baseline, args.tolerance)
+    print(f"\nCompared to {baseline_path} (tolerance {args.tolerance:.0%}):")
+    print("\n".join(lines))
+    if regressed:
+        print(f"Regressed: {', '.join(regressed)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -8,17 +8,83 @@ from pathlib import Path
 from typing import Any
 
 from pipeline_common import (
+    BATCH_REWRITE_MAX_CHARS,
+    BATCH_REWRITE_MAX_ITEMS,
+    BATCH_REWRITE_PROMPT,
+    EDIT_REWRITE_PROMPT,
     PipelineResult,
     REWRITE_PROMPT,
+    REWRITE_PROTOCOLS,
+    SENTENCE_REWRITE_PROMPT,
+    STREAM_REWRITE_CONTEXT_SENTENCES,
+    STREAM_REWRITE_MAX_WORKERS,
+    TokenUsage,
+    flac_duration_seconds,
+    parse_token_usage,
     post_multipart_transcription,
     requests_post,
+    rewrite_in_batches,
+    rewrite_with_edits,
+    rewrite_streamed_transcript,
+    stream_multipart_transcription,
     validate_flac_path,
 )
+from rate_limit import StageTimer
+from tracing import span
 
-OPENAI_TRANSCRIBE_URL = "https://api.openai.com/v1/audio/transcriptions"
-OPENAI_RESPONSES_URL = "https://api.openai.com/v1/responses"
+OPENAI_BASE_URL = "https://api.openai.com/v1"
+OPENAI_TRANSCRIBE_PATH = "/audio/transcriptions"
+OPENAI_RESPONSES_PATH = "/responses"
 OPENAI_TRANSCRIBE_MODEL = "gpt-4o-transcribe"
 OPENAI_REWRITE_MODEL = "gpt-5-mini"
+OPENAI_EDIT_REWRITE_FORMAT = {
+    "type": "json_schema",
+    "name": "rewrite_edits",
+    "strict": True,
+    "schema": {
+        "type": "object",
+        "properties": {
+            "edits": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "old": {"type": "string"},
+                        "new": {"type": "string"},
+                    },
+                    "required": ["old", "new"],
+                    "additionalProperties": False,
+                },
+            },
+        },
+        "required": ["edits"],
+        "additionalProperties": False,
+    },
+}
+OPENAI_BATCH_REWRITE_FORMAT = {
+    "type": "json_schema",
+    "name": "batch_rewrite",
+    "strict": True,
+    "schema": {
+        "type": "object",
+        "properties": {
+            "items": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "id": {"type": "string"},
+                        "text": {"type": "string"},
+                    },
+                    "required": ["id", "text"],
+                    "additionalProperties": False,
+                },
+            },
+        },
+        "required": ["items"],
+        "additionalProperties": False,
+    },
+}
 
 
 def _parse_openai_responses_output(payload: dict[str, Any]) -> str:
@@ -44,24 +110,37 @@ def _parse_openai_responses_output(payload: dict[str, Any]) -> str:
     return merged
 
 
-def _openai_rewrite(*, api_key: str, transcript: str, timeout_seconds: float) -> str:
-    payload = {
+def _openai_rewrite(
+    *,
+    api_key: str,
+    transcript: str,
+    timeout_seconds: float,
+    base_url: str = OPENAI_BASE_URL,
+    instructions: str = REWRITE_PROMPT,
+    text_format: dict[str, Any] | None = None,
+) -> tuple[str, TokenUsage]:
+    payload: dict[str, Any] = {
         "model": OPENAI_REWRITE_MODEL,
         "input": transcript,
-        "instructions": REWRITE_PROMPT,
+        "instructions": instructions,
         "reasoning": {"effort": "minimal"},
     }
-    response = requests_post(
-        OPENAI_RESPONSES_URL,
-        headers={
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json",
-        },
-        json=payload,
-        timeout=timeout_seconds,
-    )
-    response.raise_for_status()
-    return _parse_openai_responses_output(response.json())
+    if text_format is not None:
+        payload["text"] = {"format": text_format}
+    with span("rewrite.request", model=OPENAI_REWRITE_MODEL, chars=len(transcript)):
+        response = requests_post(
+            f"{base_url.rstrip('/')}{OPENAI_RESPONSES_PATH}",
+            headers={
+                "Authorization": f"Bearer {api_key}",
+                "Content-Type": "application/json",
+            },
+            json=payload,
+            timeout=timeout_seconds,
+        )
+        response.raise_for_status()
+    with span("rewrite.parse"):
+        response_payload = response.json()
+        return _parse_openai_responses_output(response_payload), parse_token_usage(response_payload)
 
 
 def run_openai_pipeline_from_flac(
@@ -69,39 +148,228 @@ def run_openai_pipeline_from_flac(
     *,
     openai_api_key: str,
     timeout_seconds: float = 180.0,
+    base_url: str = OPENAI_BASE_URL,
+    rewrite_protocol: str = "full",
 ) -> PipelineResult:
+    """Transcribe then rewrite one FLAC.
+
+    With `rewrite_protocol="edits"` the rewrite model returns edits against
+    the raw transcript, applied locally with a full-rewrite fallback.
+    """
+    if rewrite_protocol not in REWRITE_PROTOCOLS:
+        raise ValueError(f"Unknown rewrite protocol: {rewrite_protocol}")
     if not openai_api_key:
         raise ValueError("Missing OpenAI API key.")
     flac = validate_flac_path(flac_path)
 
     start_total = time.perf_counter()
 
-    start_asr = time.perf_counter()
-    raw = post_multipart_transcription(
-        url=OPENAI_TRANSCRIBE_URL,
-        api_key=openai_api_key,
-        model=OPENAI_TRANSCRIBE_MODEL,
-        flac_path=flac,
-        timeout_seconds=timeout_seconds,
-    )
-    asr_seconds = time.perf_counter() - start_asr
+    with StageTimer() as asr_timer:
+        raw, asr_usage = post_multipart_transcription(
+            url=f"{base_url.rstrip('/')}{OPENAI_TRANSCRIBE_PATH}",
+            api_key=openai_api_key,
+            model=OPENAI_TRANSCRIBE_MODEL,
+            flac_path=flac,
+            timeout_seconds=timeout_seconds,
+        )
 
-    start_rw = time.perf_counter()
-    rewritten = _openai_rewrite(
-        api_key=openai_api_key,
-        transcript=raw,
-        timeout_seconds=timeout_seconds,
-    )
-    rewrite_seconds = time.perf_counter() - start_rw
+    edits = 0
+    fallback = False
+    with StageTimer() as rewrite_timer:
+        if rewrite_protocol == "edits":
+            outcome = rewrite_with_edits(
+                raw,
+                rewrite_edits=lambda transcript: _openai_rewrite(
+                    api_key=openai_api_key,
+                    transcript=transcript,
+                    timeout_seconds=timeout_seconds,
+                    base_url=base_url,
+                    instructions=EDIT_REWRITE_PROMPT,
+                    text_format=OPENAI_EDIT_REWRITE_FORMAT,
+                ),
+                rewrite_full=lambda transcript: _openai_rewrite(
+                    api_key=openai_api_key,
+                    transcript=transcript,
+                    timeout_seconds=timeout_seconds,
+                    base_url=base_url,
+                ),
+            )
+            rewritten, rewrite_usage = outcome.text, outcome.usage
+            edits, fallback = outcome.edits, outcome.fallback
+        else:
+            rewritten, rewrite_usage = _openai_rewrite(
+                api_key=openai_api_key,
+                transcript=raw,
+                timeout_seconds=timeout_seconds,
+                base_url=base_url,
+            )
 
     return PipelineResult(
-        pipeline="openai",
+        pipeline="openai" if rewrite_protocol == "full" else f"openai-{rewrite_protocol}",
         flac_path=str(flac),
         asr_model=OPENAI_TRANSCRIBE_MODEL,
         rewrite_model=OPENAI_REWRITE_MODEL,
         raw_transcript=raw,
         rewritten_text=rewritten,
-        transcribe_seconds=asr_seconds,
-        rewrite_seconds=rewrite_seconds,
+        transcribe_seconds=asr_timer.request_seconds,
+        rewrite_seconds=rewrite_timer.request_seconds,
+        total_seconds=time.perf_counter() - start_total,
+        audio_seconds=flac_duration_seconds(flac),
+        upload_bytes=flac.stat().st_size,
+        transcribe_queue_seconds=asr_timer.queue_seconds,
+        rewrite_queue_seconds=rewrite_timer.queue_seconds,
+        request_retries=asr_timer.retries + rewrite_timer.retries,
+        transcribe_usage=asr_usage,
+        rewrite_usage=rewrite_usage,
+        rewrite_protocol=rewrite_protocol,
+        rewrite_edits=edits,
+        rewrite_fallback=fallback,
+    ).update_derived_metrics()
+
+
+def run_openai_streaming_pipeline_from_flac(
+    flac_path: str | Path,
+    *,
+    openai_api_key: str,
+    timeout_seconds: float = 180.0,
+    base_url: str = OPENAI_BASE_URL,
+    context_sentences: int = STREAM_REWRITE_CONTEXT_SENTENCES,
+    max_workers: int = STREAM_REWRITE_MAX_WORKERS,
+) -> PipelineResult:
+    """Stream the transcription and rewrite each sentence as soon as it completes.
+
+    `rewrite_seconds` is only the rewrite time left after the transcript
+    finished; the rest overlapped with transcription.
+    """
+    if not openai_api_key:
+        raise ValueError("Missing OpenAI API key.")
+    flac = validate_flac_path(flac_path)
+
+    start_total = time.perf_counter()
+    overlapped = rewrite_streamed_transcript(
+        stream_multipart_transcription(
+            url=f"{base_url.rstrip('/')}{OPENAI_TRANSCRIBE_PATH}",
+            api_key=openai_api_key,
+            model=OPENAI_TRANSCRIBE_MODEL,
+            flac_path=flac,
+            timeout_seconds=timeout_seconds,
+        ),
+        rewrite_one=lambda text: _openai_rewrite(
+            api_key=openai_api_key,
+            transcript=text,
+            timeout_seconds=timeout_seconds,
+            base_url=base_url,
+            instructions=SENTENCE_REWRITE_PROMPT,
+        ),
+        context_sentences=context_sentences,
+        max_workers=max_workers,
+    )
+
+    return PipelineResult(
+        pipeline="openai-stream",
+        flac_path=str(flac),
+        asr_model=OPENAI_TRANSCRIBE_MODEL,
+        rewrite_model=OPENAI_REWRITE_MODEL,
+        raw_transcript=overlapped.raw_transcript,
+        rewritten_text=overlapped.rewritten_text,
+        transcribe_seconds=overlapped.transcribe_seconds,
+        rewrite_seconds=overlapped.rewrite_tail_seconds,
         total_seconds=time.perf_counter() - start_total,
+        rewrite_request_seconds=overlapped.rewrite_request_seconds,
+        rewrite_segments=overlapped.segments,
+        audio_seconds=flac_duration_seconds(flac),
+        upload_bytes=flac.stat().st_size,
+        transcribe_usage=overlapped.transcribe_usage,
+        rewrite_usage=overlapped.rewrite_usage,
+        transcribe_queue_seconds=overlapped.transcribe_queue_seconds,
+        rewrite_queue_seconds=overlapped.rewrite_queue_seconds,
+        request_retries=overlapped.retries,
+    ).update_derived_metrics()
+
+
+def run_openai_pipeline_batch_from_flacs(
+    flac_paths: list[str | Path],
+    *,
+    openai_api_key: str,
+    timeout_seconds: float = 180.0,
+    base_url: str = OPENAI_BASE_URL,
+    max_batch_items: int = BATCH_REWRITE_MAX_ITEMS,
+    max_batch_chars: int = BATCH_REWRITE_MAX_CHARS,
+) -> list[PipelineResult | Exception]:
+    """Transcribe each FLAC, then rewrite all transcripts in packed batches.
+
+    Returns one entry per input path, in order: a PipelineResult, or the
+    exception that stopped that file.
+    """
+    if not openai_api_key:
+        raise ValueError("Missing OpenAI API key.")
+
+    entries: list[PipelineResult | Exception] = []
+    pending: list[int] = []
+    for flac_path in flac_paths:
+        try:
+            flac = validate_flac_path(flac_path)
+            with StageTimer() as asr_timer:
+                raw, asr_usage = post_multipart_transcription(
+                    url=f"{base_url.rstrip('/')}{OPENAI_TRANSCRIBE_PATH}",
+                    api_key=openai_api_key,
+                    model=OPENAI_TRANSCRIBE_MODEL,
+                    flac_path=flac,
+                    timeout_seconds=timeout_seconds,
+                )
+        except Exception as exc:  # noqa: BLE001
+            entries.append(exc)
+            continue
+        pending.append(len(entries))
+        entries.append(
+            PipelineResult(
+                pipeline="openai",
+                flac_path=str(flac),
+                asr_model=OPENAI_TRANSCRIBE_MODEL,
+                rewrite_model=OPENAI_REWRITE_MODEL,
+                raw_transcript=raw,
+                rewritten_text="",
+                transcribe_seconds=asr_timer.request_seconds,
+                rewrite_seconds=0.0,
+                total_seconds=asr_timer.request_seconds,
+                audio_seconds=flac_duration_seconds(flac),
+                upload_bytes=flac.stat().st_size,
+                transcribe_queue_seconds=asr_timer.queue_seconds,
+                request_retries=asr_timer.retries,
+                transcribe_usage=asr_usage,
+            )
+        )
+
+    outcomes = rewrite_in_batches(
+        [entries[index].raw_transcript for index in pending],
+        rewrite_batch=lambda packed: _openai_rewrite(
+            api_key=openai_api_key,
+            transcript=packed,
+            timeout_seconds=timeout_seconds,
+            base_url=base_url,
+            instructions=BATCH_REWRITE_PROMPT,
+            text_format=OPENAI_BATCH_REWRITE_FORMAT,
+        ),
+        rewrite_one=lambda transcript: _openai_rewrite(
+            api_key=openai_api_key,
+            transcript=transcript,
+            timeout_seconds=timeout_seconds,
+            base_url=base_url,
+        ),
+        max_items=max_batch_items,
+        max_chars=max_batch_chars,
     )
+    for index, outcome in zip(pending, outcomes):
+        if outcome.text is None:
+            entries[index] = RuntimeError(f"Rewrite failed: {outcome.error}")
+            continue
+        result = entries[index]
+        result.rewritten_text = outcome.text
+        result.rewrite_seconds = outcome.seconds
+        result.rewrite_batch_size = outcome.batch_size
+        result.total_seconds = result.transcribe_seconds + outcome.seconds
+        result.rewrite_usage = outcome.usage
+        result.rewrite_queue_seconds = outcome.queue_seconds
+        result.request_retries += outcome.retries
+        result.update_derived_metrics()
+    return entries
@@ -3,13 +3,150 @@
 
 from __future__ import annotations
 
+import json
 import mimetypes
-from dataclasses import dataclass
+import re
+import time
+from collections.abc import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import Any
+
+from rate_limit import StageTimer, get_scheduler
+from tracing import span
 
 REWRITE_PROMPT = """Rewrite the raw text with correct grammar, punctuation and capitalization.
 Preserve meaning. Return plain text only."""
 
+BATCH_REWRITE_PROMPT = """You receive a JSON array of items, each with an "id" and a raw "text".
+Rewrite every text with correct grammar, punctuation and capitalization.
+Preserve meaning. Treat each item independently.
+Return only a JSON object of the form {"items": [{"id": "...", "text": "..."}]}
+with exactly one entry per input id."""
+
+BATCH_REWRITE_MAX_ITEMS = 32
+BATCH_REWRITE_MAX_CHARS = 12000
+# Statuses that can mean the batch was too large; only these (and unparseable
+# responses) split a batch in half. Other failures fail the whole batch.
+BATCH_REWRITE_SPLIT_STATUS_CODES = frozenset({400, 413})
+
+SENTENCE_REWRITE_PROMPT = """Rewrite the text after TEXT: with correct grammar, punctuation and capitalization.
+Text after CONTEXT: is the preceding part of the same dictation, for reference only;
+never repeat or rewrite it. Preserve meaning. Return plain text only."""
+
+EDIT_REWRITE_PROMPT = """Fix grammar, punctuation and capitalization of the raw text. Preserve meaning.
+Do not return the corrected text. Return only a JSON object {"edits": [{"old": "...", "new": "..."}]}:
+- "old" is an exact, short span copied from the raw text; "new" is its replacement
+- list edits in the order they appear in the raw text, without overlaps
+- include a few surrounding words in "old" only when needed to make it unambiguous
+- return {"edits": []} if nothing needs to change"""
+
+# full: the model returns the whole corrected text.
+# edits: the model returns EDIT_REWRITE_PROMPT edits that are applied locally.
+REWRITE_PROTOCOLS = ("full", "edits")
+# Edits covering more of the transcript than this are rejected; a full rewrite
+# is as cheap at that point and less error-prone.
+EDIT_REWRITE_MAX_COVERAGE = 0.6
+# An `old` span this short that occurs twice before the next edit is ambiguous.
+EDIT_REWRITE_AMBIGUOUS_MAX_CHARS = 20
+
+STREAM_REWRITE_CONTEXT_SENTENCES = 2
+STREAM_REWRITE_MIN_CHARS = 40
+STREAM_REWRITE_MAX_WORKERS = 4
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+# Estimated list prices, USD per 1M tokens (or per audio hour for
+# duration-billed ASR). Keep in sync with provider pricing pages.
+# List prices of the hosted providers' models (USD per 1M tokens, or per audio
+# hour). Config-defined pipelines do not use this table; see CompatiblePipelineConfig.
+MODEL_PRICING_USD = {
+    "gpt-4o-transcribe": {"input": 6.00, "cached_input": 6.00, "output": 10.00},
+    "gpt-5-mini": {"input": 0.25, "cached_input": 0.025, "output": 2.00},
+    "whisper-large-v3": {"audio_hour": 0.111},
+    "moonshotai/kimi-k2-instruct": {"input": 1.00, "cached_input": 0.50, "output": 3.00},
+}
+
+
+@dataclass
+class TokenUsage:
+    input_tokens: int = 0
+    output_tokens: int = 0
+    reasoning_tokens: int = 0
+    cached_input_tokens: int = 0
+    total_tokens: int = 0
+
+    def __add__(self, other: TokenUsage) -> TokenUsage:
+        return TokenUsage(
+            input_tokens=self.input_tokens + other.input_tokens,
+            output_tokens=self.output_tokens + other.output_tokens,
+            reasoning_tokens=self.reasoning_tokens + other.reasoning_tokens,
+            cached_input_tokens=self.cached_input_tokens + other.cached_input_tokens,
+            total_tokens=self.total_tokens + other.total_tokens,
+        )
+
+
+def parse_token_usage(payload: dict[str, Any]) -> TokenUsage:
+    """Read the `usage` block of a Responses, Chat Completions or transcription payload."""
+    usage = payload.get("usage")
+    if not isinstance(usage, dict):
+        return TokenUsage()
+
+    def count(block: Any, *keys: str) -> int:
+        for key in keys:
+            value = block.get(key) if isinstance(block, dict) else None
+            if isinstance(value, (int, float)):
+                return int(value)
+        return 0
+
+    input_details = usage.get("input_tokens_details") or usage.get("prompt_tokens_details")
+    output_details = usage.get("output_tokens_details") or usage.get("completion_tokens_details")
+    input_tokens = count(usage, "input_tokens", "prompt_tokens")
+    output_tokens = count(usage, "output_tokens", "completion_tokens")
+    return TokenUsage(
+        input_tokens=input_tokens,
+        output_tokens=output_tokens,
+        reasoning_tokens=count(output_details, "reasoning_tokens"),
+        cached_input_tokens=count(input_details, "cached_tokens"),
+        total_tokens=count(usage, "total_tokens") or input_tokens + output_tokens,
+    )
+
+
+def estimate_cost_usd(
+    model: str,
+    usage: TokenUsage,
+    audio_seconds: float = 0.0,
+    *,
+    pricing: dict[str, float] | None = None,
+) -> float:
+    """Cost from `pricing`, or from MODEL_PRICING_USD when it is None; {} is free."""
+    if pricing is None:
+        pricing = MODEL_PRICING_USD.get(model)
+    if not pricing:
+        return 0.0
+    if "audio_hour" in pricing:
+        return pricing["audio_hour"] * audio_seconds / 3600.0
+    uncached = max(usage.input_tokens - usage.cached_input_tokens, 0)
+    return (
+        uncached * pricing["input"]
+        + usage.cached_input_tokens * pricing["cached_input"]
+        + usage.output_tokens * pricing["output"]
+    ) / 1_000_000
+
+
+def flac_duration_seconds(flac_path: Path) -> float:
+    """Read the duration from the FLAC STREAMINFO block without decoding audio."""
+    with flac_path.open("rb") as flac_file:
+        header = flac_file.read(4 + 4 + 18)
+    if len(header) < 26 or header[:4] != b"fLaC":
+        return 0.0
+    info = header[8:]
+    sample_rate = (info[10] << 12) | (info[11] << 4) | (info[12] >> 4)
+    total_samples = ((info[13] & 0x0F) << 32) | int.from_bytes(info[14:18], "big")
+    if not sample_rate:
+        return 0.0
+    return total_samples / sample_rate
+
 
 @dataclass
 class PipelineResult:
@@ -22,6 +159,56 @@ class PipelineResult:
     transcribe_seconds: float
     rewrite_seconds: float
     total_seconds: float
+    # Summed request time of every rewrite call. Same as rewrite_seconds unless
+    # rewrites overlapped with ASR (openai-stream), where rewrite_seconds is
+    # only the tail left after the transcript finished.
+    rewrite_request_seconds: float = 0.0
+    rewrite_batch_size: int = 1
+    rewrite_segments: int = 1
+    # >1 when live mode transcribed the recording as separate speech segments.
+    transcribe_segments: int = 1
+    rewrite_protocol: str = "full"
+    rewrite_edits: int = 0
+    rewrite_fallback: bool = False
+    audio_seconds: float = 0.0
+    upload_bytes: int = 0
+    # Time spent waiting in the request scheduler (pacing, Retry-After, backoff);
+    # excluded from transcribe_seconds / rewrite_seconds.
+    transcribe_queue_seconds: float = 0.0
+    rewrite_queue_seconds: float = 0.0
+    request_retries: int = 0
+    transcribe_usage: TokenUsage = field(default_factory=TokenUsage)
+    rewrite_usage: TokenUsage = field(default_factory=TokenUsage)
+    estimated_cost_usd: float = 0.0
+    rewrite_output_tokens_per_second: float = 0.0
+    audio_seconds_per_wall_second: float = 0.0
+
+    def update_derived_metrics(
+        self,
+        *,
+        transcribe_pricing: dict[str, float] | None = None,
+        rewrite_pricing: dict[str, float] | None = None,
+    ) -> PipelineResult:
+        """Recompute cost and rates. `rewrite_usage` covers the whole shared request
+        when `rewrite_batch_size` > 1, so cost is split evenly across its items.
+        An unset `rewrite_request_seconds` defaults to `rewrite_seconds`.
+        Pricing defaults to the MODEL_PRICING_USD list price of each model."""
+        if self.rewrite_request_seconds <= 0:
+            self.rewrite_request_seconds = self.rewrite_seconds
+        self.estimated_cost_usd = estimate_cost_usd(
+            self.asr_model, self.transcribe_usage, self.audio_seconds, pricing=transcribe_pricing
+        ) + estimate_cost_usd(
+            self.rewrite_model, self.rewrite_usage, pricing=rewrite_pricing
+        ) / max(self.rewrite_batch_size, 1)
+        self.rewrite_output_tokens_per_second = (
+            self.rewrite_usage.output_tokens / self.rewrite_request_seconds
+            if self.rewrite_request_seconds > 0
+            else 0.0
+        )
+        self.audio_seconds_per_wall_second = (
+            self.audio_seconds / self.total_seconds if self.total_seconds > 0 else 0.0
+        )
+        return self
 
 
 def validate_flac_path(flac_path: str | Path) -> Path:
@@ -33,15 +220,60 @@ def validate_flac_path(flac_path: str | Path) -> Path:
     return path
 
 
-def requests_post(*args, **kwargs):
+def collect_flac_paths(inputs: list[str]) -> list[Path]:
+    """Expand FLAC files and directories (non-recursive, sorted) into a path list."""
+    paths: list[Path] = []
+    for item in inputs:
+        path = Path(item).expanduser().resolve()
+        if path.is_dir():
+            paths.extend(sorted(p for p in path.iterdir() if p.suffix.lower() == ".flac"))
+        else:
+            paths.append(path)
+    return paths
+
+
+def auth_headers(api_key: str) -> dict[str, str]:
+    """Bearer auth header, omitted for keyless (e.g. local) servers."""
+    return {"Authorization": f"Bearer {api_key}"} if api_key else {}
+
+
+def http_status_code(exc: BaseException) -> int | None:
+    """HTTP status of a `requests` error raised by `raise_for_status`, if any."""
+    response = getattr(exc, "response", None)
+    status = getattr(response, "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def requests_post(url: str, **kwargs):
+    """POST through the shared rate-limit-aware scheduler (pacing + retries)."""
     try:
-        import requests
+        import requests  # noqa: F401
     except Exception as exc:  # noqa: BLE001
         raise RuntimeError(
             "HTTP calls require `requests`. Install with: "
             "uv sync"
         ) from exc
-    return requests.post(*args, **kwargs)
+    return get_scheduler().post(url, **kwargs)
+
+
+def multipart_transcription_request(
+    *,
+    api_key: str,
+    model: str,
+    flac_name: str,
+    flac_file: Any,
+    stream: bool = False,
+) -> dict[str, Any]:
+    """Headers, form fields and file part for a transcription upload."""
+    mime = mimetypes.guess_type(flac_name)[0] or "audio/flac"
+    data = {"model": model}
+    if stream:
+        data["stream"] = "true"
+    return {
+        "headers": auth_headers(api_key),
+        "data": data,
+        "files": {"file": (flac_name, flac_file, mime)},
+    }
 
 
 def post_multipart_transcription(
@@ -51,23 +283,490 @@ def post_multipart_transcription(
     model: str,
     flac_path: Path,
     timeout_seconds: float,
+) -> tuple[str, TokenUsage]:
+    with span("asr.request", model=model, file=flac_path.name), flac_path.open("rb") as flac_file:
+        response = requests_post(
+            url,
+            **multipart_transcription_request(
+                api_key=api_key, model=model, flac_name=flac_path.name, flac_file=flac_file
+            ),
+            timeout=timeout_seconds,
+        )
+        response.raise_for_status()
+    with span("asr.parse"):
+        payload = response.json()
+        text = payload.get("text")
+        if not isinstance(text, str) or not text.strip():
+            raise ValueError("Transcription response missing text.")
+        return text.strip(), parse_token_usage(payload)
+
+
+def _extract_json_object(text: str) -> Any:
+    body = text.strip()
+    start, end = body.find("{"), body.rfind("}")
+    if start < 0 or end < start:
+        raise ValueError("Response is not a JSON object.")
+    return json.loads(body[start : end + 1])
+
+
+def parse_edit_rewrite_output(text: str) -> list[tuple[str, str]]:
+    payload = _extract_json_object(text)
+    edits = payload.get("edits") if isinstance(payload, dict) else None
+    if not isinstance(edits, list):
+        raise ValueError("Edit rewrite response missing edits list.")
+    parsed: list[tuple[str, str]] = []
+    for item in edits:
+        if not isinstance(item, dict):
+            raise ValueError("Edit rewrite item is not an object.")
+        old, new = item.get("old"), item.get("new")
+        if not isinstance(old, str) or not isinstance(new, str) or not old:
+            raise ValueError("Edit rewrite item needs non-empty `old` and string `new`.")
+        parsed.append((old, new))
+    return parsed
+
+
+def _find_edit_target(raw: str, old: str, start: int) -> re.Match[str] | None:
+    """Find `old` at or after `start` without matching inside a word."""
+    pattern = re.escape(old)
+    if re.match(r"\w", old):
+        pattern = r"(?<!\w)" + pattern
+    if re.search(r"\w$", old):
+        pattern += r"(?!\w)"
+    return re.compile(pattern).search(raw, start)
+
+
+def apply_rewrite_edits(
+    raw: str,
+    edits: list[tuple[str, str]],
+    *,
+    max_coverage: float = EDIT_REWRITE_MAX_COVERAGE,
 ) -> str:
-    mime = mimetypes.guess_type(flac_path.name)[0] or "audio/flac"
-    headers = {"Authorization": f"Bearer {api_key}"}
-    data = {"model": model}
+    """Apply ordered (old, new) edits to `raw`, scanning forward.
 
-    with flac_path.open("rb") as flac_file:
-        files = {"file": (flac_path.name, flac_file, mime)}
+    Each `old` must occur at or after the end of the previous edit, on word
+    boundaries. Raises ValueError when an edit cannot be placed, when a short
+    `old` occurs more than once before the next edit, or when the edits
+    rewrite more than `max_coverage` of the text.
+    """
+    covered = sum(len(old) for old, _ in edits)
+    if raw and covered / len(raw) > max_coverage:
+        raise ValueError("Edits cover too much of the transcript.")
+    pieces: list[str] = []
+    cursor = 0
+    for position, (old, new) in enumerate(edits):
+        match = _find_edit_target(raw, old, cursor)
+        if match is None:
+            raise ValueError(f"Edit target not found in order: {old!r}")
+        if len(old) <= EDIT_REWRITE_AMBIGUOUS_MAX_CHARS:
+            limit = len(raw)
+            if position + 1 < len(edits):
+                following = _find_edit_target(raw, edits[position + 1][0], match.end())
+                limit = following.start() if following else len(raw)
+            repeat = _find_edit_target(raw, old, match.end())
+            if repeat is not None and repeat.end() <= limit:
+                raise ValueError(f"Edit target is ambiguous: {old!r}")
+        pieces.append(raw[cursor : match.start()])
+        pieces.append(new)
+        cursor = match.end()
+    pieces.append(raw[cursor:])
+    result = "".join(pieces).strip()
+    if not result:
+        raise ValueError("Edits produced empty text.")
+    return result
+
+
+@dataclass
+class EditRewriteOutcome:
+    text: str
+    usage: TokenUsage
+    edits: int
+    fallback: bool
+
+
+def rewrite_with_edits(
+    transcript: str,
+    *,
+    rewrite_edits: Callable[[str], tuple[str, TokenUsage]],
+    rewrite_full: Callable[[str], tuple[str, TokenUsage]],
+) -> EditRewriteOutcome:
+    """Ask for edits against `transcript` and apply them locally.
+
+    Falls back to `rewrite_full` when the edit response is malformed or does
+    not apply cleanly; usage then includes both requests.
+    """
+    response, usage = rewrite_edits(transcript)
+    try:
+        edits = parse_edit_rewrite_output(response)
+        return EditRewriteOutcome(apply_rewrite_edits(transcript, edits), usage, len(edits), False)
+    except (ValueError, json.JSONDecodeError):
+        text, full_usage = rewrite_full(transcript)
+        return EditRewriteOutcome(text, usage + full_usage, 0, True)
+
+
+def iter_sse_events(response) -> Iterator[dict[str, Any]]:
+    """Yield JSON payloads from a server-sent-events response."""
+    for line in response.iter_lines(decode_unicode=True):
+        if not line or not line.startswith("data:"):
+            continue
+        data = line[len("data:") :].strip()
+        if data == "[DONE]":
+            return
+        try:
+            event = json.loads(data)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(event, dict):
+            yield event
+
+
+def stream_multipart_transcription(
+    *,
+    url: str,
+    api_key: str,
+    model: str,
+    flac_path: Path,
+    timeout_seconds: float,
+) -> Iterator[dict[str, Any]]:
+    """Request a streamed transcription and yield its events.
+
+    Yields `transcript.text.delta` events as they arrive and always ends with
+    one `transcript.text.done` event carrying the full text and usage. Servers
+    that ignore `stream` and answer with plain JSON yield only the done event.
+    """
+    with span("asr.stream", model=model, file=flac_path.name), flac_path.open("rb") as flac_file:
         response = requests_post(
             url,
-            headers=headers,
-            data=data,
-            files=files,
+            **multipart_transcription_request(
+                api_key=api_key,
+                model=model,
+                flac_name=flac_path.name,
+                flac_file=flac_file,
+                stream=True,
+            ),
             timeout=timeout_seconds,
+            stream=True,
         )
-    response.raise_for_status()
-    payload = response.json()
-    text = payload.get("text")
-    if not isinstance(text, str) or not text.strip():
-        raise ValueError("Transcription response missing text.")
-    return text.strip()
+        response.raise_for_status()
+        if "text/event-stream" not in response.headers.get("Content-Type", ""):
+            payload = response.json()
+            yield {"type": "transcript.text.done", "text": payload.get("text", ""), **payload}
+            return
+        parts: list[str] = []
+        for event in iter_sse_events(response):
+            if event.get("type") == "transcript.text.delta":
+                delta = event.get("delta")
+                if isinstance(delta, str) and delta:
+                    parts.append(delta)
+                    yield event
+            elif event.get("type") == "transcript.text.done":
+                yield event
+                return
+        yield {"type": "transcript.text.done", "text": "".join(parts)}
+
+
+class SentenceAccumulator:
+    """Collects streamed text and releases complete sentences.
+
+    Sentences shorter than `min_chars` are held back and merged with the next
+    one, so a burst of short sentences does not become a burst of requests.
+    """
+
+    def __init__(self, min_chars: int = STREAM_REWRITE_MIN_CHARS):
+        self.min_chars = min_chars
+        self._buffer = ""
+
+    def feed(self, text: str) -> list[str]:
+        self._buffer += text
+        pieces = _SENTENCE_END.split(self._buffer)
+        if len(pieces) < 2:
+            return []
+        self._buffer = pieces[-1]
+        return self._merge(pieces[:-1])
+
+    def flush(self) -> list[str]:
+        rest, self._buffer = self._buffer.strip(), ""
+        if not rest:
+            return []
+        return [rest]
+
+    def _merge(self, sentences: list[str]) -> list[str]:
+        ready: list[str] = []
+        pending = ""
+        for sentence in sentences:
+            sentence = sentence.strip()
+            if not sentence:
+                continue
+            pending = f"{pending} {sentence}".strip()
+            if len(pending) >= self.min_chars:
+                ready.append(pending)
+                pending = ""
+        if pending:
+            self._buffer = f"{pending} {self._buffer}"
+        return ready
+
+
+def build_sentence_rewrite_input(sentence: str, context: list[str]) -> str:
+    if not context:
+        return f"TEXT:\n{sentence}"
+    return f"CONTEXT:\n{' '.join(context)}\n\nTEXT:\n{sentence}"
+
+
+@dataclass
+class OverlappedRewrite:
+    raw_transcript: str
+    rewritten_text: str
+    transcribe_seconds: float
+    rewrite_tail_seconds: float
+    # Request time summed over every sentence rewrite.
+    rewrite_request_seconds: float
+    segments: int
+    transcribe_usage: TokenUsage
+    rewrite_usage: TokenUsage
+    transcribe_queue_seconds: float = 0.0
+    rewrite_queue_seconds: float = 0.0
+    retries: int = 0
+
+
+def rewrite_streamed_transcript(
+    events: Iterator[dict[str, Any]],
+    *,
+    rewrite_one: Callable[[str], tuple[str, TokenUsage]],
+    context_sentences: int = STREAM_REWRITE_CONTEXT_SENTENCES,
+    min_chars: int = STREAM_REWRITE_MIN_CHARS,
+    max_workers: int = STREAM_REWRITE_MAX_WORKERS,
+) -> OverlappedRewrite:
+    """Rewrite each completed sentence while transcription is still streaming.
+
+    Every sentence is sent to `rewrite_one` (with SENTENCE_REWRITE_PROMPT input
+    built from the sentence and up to `context_sentences` preceding raw
+    sentences) as soon as it is complete; rewritten pieces are joined in
+    spoken order. `rewrite_tail_seconds` is the rewrite time left after the
+    transcript finished, i.e. the part that did not overlap with ASR.
+    `rewrite_queue_seconds` sums scheduler waits across the rewrite workers.
+    """
+    start = time.perf_counter()
+    accumulator = SentenceAccumulator(min_chars)
+    sentences: list[str] = []
+    futures = []
+    final_text = ""
+    transcribe_usage = TokenUsage()
+
+    def timed_rewrite(text: str) -> tuple[tuple[str, TokenUsage], StageTimer]:
+        with StageTimer() as timer:
+            return rewrite_one(text), timer
+
+    def submit(ready: list[str], executor: ThreadPoolExecutor) -> None:
+        for sentence in ready:
+            context = sentences[-context_sentences:] if context_sentences > 0 else []
+            futures.append(
+                executor.submit(timed_rewrite, build_sentence_rewrite_input(sentence, context))
+            )
+            sentences.append(sentence)
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="rewrite") as executor:
+        with StageTimer() as asr_timer:
+            for event in events:
+                if event.get("type") == "transcript.text.delta":
+                    submit(accumulator.feed(event["delta"]), executor)
+                elif event.get("type") == "transcript.text.done":
+                    final_text = str(event.get("text") or "").strip()
+                    transcribe_usage = parse_token_usage(event)
+        asr_done = time.perf_counter()
+        if not final_text:
+            raise ValueError("Transcription response missing text.")
+        tail = accumulator.flush()
+        if not sentences and not tail:
+            # Nothing was streamed: split the final transcript instead.
+            tail = accumulator.feed(final_text + " ") + accumulator.flush()
+        submit(tail, executor)
+
+        pieces: list[str] = []
+        rewrite_usage = TokenUsage()
+        rewrite_queue_seconds = 0.0
+        rewrite_request_seconds = 0.0
+        retries = asr_timer.retries
+        for future in futures:
+            (text, usage), timer = future.result()
+            pieces.append(text.strip())
+            rewrite_usage = rewrite_usage + usage
+            rewrite_queue_seconds += timer.queue_seconds
+            rewrite_request_seconds += timer.request_seconds
+            retries += timer.retries
+
+    return OverlappedRewrite(
+        raw_transcript=final_text,
+        rewritten_text=" ".join(piece for piece in pieces if piece),
+        transcribe_seconds=asr_done - start - asr_timer.queue_seconds,
+        rewrite_tail_seconds=time.perf_counter() - asr_done,
+        rewrite_request_seconds=rewrite_request_seconds,
+        segments=len(futures),
+        transcribe_usage=transcribe_usage,
+        rewrite_usage=rewrite_usage,
+        transcribe_queue_seconds=asr_timer.queue_seconds,
+        rewrite_queue_seconds=rewrite_queue_seconds,
+        retries=retries,
+    )
+
+
+@dataclass
+class RewriteOutcome:
+    text: str | None
+    seconds: float
+    batch_size: int
+    error: str | None = None
+    usage: TokenUsage = field(default_factory=TokenUsage)
+    queue_seconds: float = 0.0
+    retries: int = 0
+
+
+def split_rewrite_batches(
+    transcripts: list[str],
+    *,
+    max_items: int = BATCH_REWRITE_MAX_ITEMS,
+    max_chars: int = BATCH_REWRITE_MAX_CHARS,
+) -> list[list[int]]:
+    """Group transcript indexes into batches bounded by item count and size.
+
+    A transcript longer than `max_chars` on its own always gets its own batch.
+    """
+    batches: list[list[int]] = []
+    current: list[int] = []
+    current_chars = 0
+    for index, transcript in enumerate(transcripts):
+        size = len(transcript)
+        if current and (len(current) >= max_items or current_chars + size > max_chars):
+            batches.append(current)
+            current = []
+            current_chars = 0
+        current.append(index)
+        current_chars += size
+    if current:
+        batches.append(current)
+    return batches
+
+
+def build_batch_rewrite_input(items: dict[str, str]) -> str:
+    return json.dumps(
+        [{"id": item_id, "text": text} for item_id, text in items.items()],
+        ensure_ascii=False,
+    )
+
+
+def parse_batch_rewrite_output(text: str, expected_ids: list[str]) -> dict[str, str]:
+    """Parse a batched rewrite response, keeping only well-formed expected items.
+
+    Raises ValueError when the response is not a JSON object with an item list.
+    Items with unknown ids, duplicate ids or empty text are dropped so the
+    caller can fall back to single rewrites for them.
+    """
+    payload = _extract_json_object(text)
+    items = payload.get("items") if isinstance(payload, dict) else None
+    if not isinstance(items, list):
+        raise ValueError("Batch rewrite response missing items list.")
+
+    expected = set(expected_ids)
+    seen: set[str] = set()
+    parsed: dict[str, str] = {}
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        item_id = str(item.get("id", ""))
+        rewritten = item.get("text")
+        if item_id not in expected or not isinstance(rewritten, str) or not rewritten.strip():
+            continue
+        if item_id in seen:
+            parsed.pop(item_id, None)
+            continue
+        seen.add(item_id)
+        parsed[item_id] = rewritten.strip()
+    return parsed
+
+
+def rewrite_in_batches(
+    transcripts: list[str],
+    *,
+    rewrite_batch: Callable[[str], tuple[str, TokenUsage]],
+    rewrite_one: Callable[[str], tuple[str, TokenUsage]],
+    max_items: int = BATCH_REWRITE_MAX_ITEMS,
+    max_chars: int = BATCH_REWRITE_MAX_CHARS,
+) -> list[RewriteOutcome]:
+    """Rewrite many transcripts with as few provider requests as possible.
+
+    Returns one outcome per transcript, in input order.
+
+    `rewrite_batch` sends a packed JSON item list (see BATCH_REWRITE_PROMPT) and
+    returns the raw response text with its usage; `rewrite_one` rewrites a
+    single transcript. Items taken from a batch response all carry the usage of
+    their shared request, with `batch_size` counting those items.
+    A batch whose response cannot be parsed, or that is rejected with a
+    BATCH_REWRITE_SPLIT_STATUS_CODES status, is split in half and retried; any
+    other failure (auth, exhausted rate limits, timeouts) fails every item of
+    the batch. Items missing from an otherwise valid response are rewritten
+    one by one.
+    """
+    outcomes: list[RewriteOutcome | None] = [None] * len(transcripts)
+
+    def rewrite_single(index: int) -> None:
+        text, usage, error = None, TokenUsage(), None
+        with StageTimer() as timer:
+            try:
+                text, usage = rewrite_one(transcripts[index])
+            except Exception as exc:  # noqa: BLE001
+                error = str(exc)
+        outcomes[index] = RewriteOutcome(
+            text, timer.request_seconds, 1, error, usage, timer.queue_seconds, timer.retries
+        )
+
+    def run_batch(indexes: list[int]) -> None:
+        if len(indexes) == 1:
+            rewrite_single(indexes[0])
+            return
+        ids = [str(index) for index in indexes]
+        try:
+            with StageTimer() as timer, span("rewrite.batch", items=len(indexes)):
+                response, usage = rewrite_batch(
+                    build_batch_rewrite_input({str(index): transcripts[index] for index in indexes})
+                )
+                parsed = parse_batch_rewrite_output(response, ids)
+        except Exception as exc:  # noqa: BLE001
+            too_large = http_status_code(exc) in BATCH_REWRITE_SPLIT_STATUS_CODES
+            if isinstance(exc, ValueError) or too_large:
+                middle = len(indexes) // 2
+                run_batch(indexes[:middle])
+                run_batch(indexes[middle:])
+                return
+            for index in indexes:
+                outcomes[index] = RewriteOutcome(
+                    None,
+                    timer.request_seconds,
+                    len(indexes),
+                    str(exc),
+                    queue_seconds=timer.queue_seconds,
+                    retries=timer.retries,
+                )
+            return
+        # Only items that took the batch result share its cost; missing ones
+        # pay for their own single rewrite.
+        for index in indexes:
+            text = parsed.get(str(index))
+            if text is None:
+                rewrite_single(index)
+            else:
+                outcomes[index] = RewriteOutcome(
+                    text,
+                    timer.request_seconds,
+                    len(parsed),
+                    usage=usage,
+                    queue_seconds=timer.queue_seconds,
+                    retries=timer.retries,
+                )
+
+    for batch in split_rewrite_batches(transcripts, max_items=max_items, max_chars=max_chars):
+        run_batch(batch)
+    # Callers pair outcomes with their inputs by position, so never drop a slot.
+    filled: list[RewriteOutcome] = []
+    for index, outcome in enumerate(outcomes):
+        if outcome is None:
+            raise RuntimeError(f"Batch rewrite left transcript {index} without an outcome.")
+        filled.append(outcome)
+    return filled
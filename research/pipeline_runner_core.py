@@ -4,23 +4,91 @@
 from __future__ import annotations
 
 import sys
-from dataclasses import asdict
+import time
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
 from pathlib import Path
 
-from groq_pipeline import run_groq_pipeline_from_flac
-from openai_pipeline import run_openai_pipeline_from_flac
-from pipeline_common import PipelineResult
+from compatible_pipeline import (
+    CompatiblePipelineConfig,
+    _compatible_rewrite,
+    default_pipelines_config_path,
+    load_pipeline_configs,
+    run_compatible_pipeline_from_flac,
+)
+from groq_pipeline import (
+    GROQ_BASE_URL,
+    GROQ_REWRITE_MODEL,
+    GROQ_TRANSCRIBE_MODEL,
+    GROQ_TRANSCRIBE_PATH,
+    _groq_rewrite,
+    run_groq_pipeline_batch_from_flacs,
+    run_groq_pipeline_from_flac,
+)
+from live_transcription import LiveSegmentTranscriber
+from openai_pipeline import (
+    OPENAI_BASE_URL,
+    OPENAI_REWRITE_MODEL,
+    OPENAI_TRANSCRIBE_MODEL,
+    OPENAI_TRANSCRIBE_PATH,
+    _openai_rewrite,
+    run_openai_pipeline_batch_from_flacs,
+    run_openai_pipeline_from_flac,
+    run_openai_streaming_pipeline_from_flac,
+)
+from pipeline_common import (
+    BATCH_REWRITE_MAX_CHARS,
+    BATCH_REWRITE_MAX_ITEMS,
+    PipelineResult,
+    TokenUsage,
+    flac_duration_seconds,
+    post_multipart_transcription,
+    validate_flac_path,
+)
+from rate_limit import StageTimer
+from tracing import span
 
-PIPELINE_IDS = ("openai", "groq")
+PIPELINE_IDS = ("openai", "groq", "openai-stream", "openai-edits", "groq-edits")
+DEFAULT_PIPELINE_IDS = ("openai", "groq")
+BATCH_PIPELINE_IDS = ("openai", "groq")
+# Built-ins that can transcribe live segments; config pipelines with the full
+# rewrite protocol can too.
+LIVE_PIPELINE_IDS = ("openai", "groq")
 PIPELINE_DESCRIPTIONS = {
     "openai": "app-like OpenAI pipeline (gpt-4o-transcribe -> gpt-5-mini)",
+    "openai-stream": (
+        "OpenAI pipeline with streamed ASR; each sentence is rewritten while "
+        "transcription continues"
+    ),
     "groq": "Groq pipeline (whisper-large-v3 -> moonshotai/kimi-k2-instruct)",
+    "openai-edits": "OpenAI pipeline; rewrite returns edits applied locally",
+    "groq-edits": "Groq pipeline; rewrite returns edits applied locally",
 }
+# Extra pipelines loaded from a JSON config (local/LAN OpenAI-compatible servers).
+COMPATIBLE_PIPELINES: dict[str, CompatiblePipelineConfig] = {}
+
+
+def register_pipeline_configs(path: str | Path | None = None) -> list[str]:
+    """Load config-defined pipelines from `path` (or the default location).
+
+    Returns the registered ids; no path and no default config registers nothing.
+    """
+    config_path = Path(path) if path else default_pipelines_config_path()
+    if config_path is None:
+        return []
+    configs = load_pipeline_configs(config_path)
+    clashes = [name for name in configs if name in PIPELINE_IDS]
+    if clashes:
+        raise ValueError(f"Config pipeline id(s) clash with built-ins: {', '.join(clashes)}")
+    COMPATIBLE_PIPELINES.update(configs)
+    return list(configs)
 
 
 def resolve_pipelines(selected: list[str]) -> list[str]:
     cleaned = [item.strip().lower() for item in selected if item.strip()]
-    unknown = [item for item in cleaned if item not in PIPELINE_IDS]
+    unknown = [
+        item for item in cleaned if item not in PIPELINE_IDS and item not in COMPATIBLE_PIPELINES
+    ]
     if unknown:
         raise ValueError(f"Unknown pipeline id(s): {', '.join(unknown)}")
 
@@ -37,6 +105,8 @@ def available_pipelines_text() -> str:
     lines = ["Available pipelines:"]
     for pipeline in PIPELINE_IDS:
         lines.append(f"- {pipeline}: {PIPELINE_DESCRIPTIONS[pipeline]}")
+    for pipeline, config in COMPATIBLE_PIPELINES.items():
+        lines.append(f"- {pipeline}: {config.describe()}")
     return "\n".join(lines)
 
 
@@ -44,14 +114,81 @@ def print_pipeline_result(result: PipelineResult) -> None:
     print(f"\n[{result.pipeline}] {Path(result.flac_path).name}")
     print(f"  asr_model: {result.asr_model}")
     print(f"  rewrite_model: {result.rewrite_model}")
+    batch_note = f" (batch of {result.rewrite_batch_size})" if result.rewrite_batch_size > 1 else ""
     print(
         f"  timing: asr={result.transcribe_seconds:.2f}s "
-        f"rewrite={result.rewrite_seconds:.2f}s total={result.total_seconds:.2f}s"
+        f"rewrite={result.rewrite_seconds:.2f}s{batch_note} total={result.total_seconds:.2f}s"
+    )
+    print(
+        f"  usage: audio={result.audio_seconds:.2f}s upload={result.upload_bytes}B "
+        f"rewrite_tokens(in={result.rewrite_usage.input_tokens} "
+        f"cached={result.rewrite_usage.cached_input_tokens} "
+        f"out={result.rewrite_usage.output_tokens} "
+        f"reasoning={result.rewrite_usage.reasoning_tokens}) "
+        f"cost=${result.estimated_cost_usd:.5f}"
     )
+    if result.transcribe_queue_seconds or result.rewrite_queue_seconds or result.request_retries:
+        print(
+            f"  queue: asr={result.transcribe_queue_seconds:.2f}s "
+            f"rewrite={result.rewrite_queue_seconds:.2f}s retries={result.request_retries}"
+        )
+    if result.transcribe_segments > 1:
+        print(f"  transcribe_segments: {result.transcribe_segments}")
+    if result.rewrite_protocol == "edits":
+        fallback_note = " (fell back to full rewrite)" if result.rewrite_fallback else ""
+        print(f"  rewrite_edits: {result.rewrite_edits}{fallback_note}")
     print(f"  raw: {result.raw_transcript}")
     print(f"  rewritten: {result.rewritten_text}")
 
 
+def run_pipeline(
+    pipeline: str,
+    flac_path: str | Path,
+    *,
+    timeout_seconds: float,
+    openai_api_key: str,
+    groq_api_key: str,
+    base_urls: dict[str, str] | None = None,
+) -> PipelineResult:
+    """Run one pipeline on one FLAC file; errors propagate to the caller.
+
+    `base_urls` optionally maps pipeline ids to an API base URL, e.g. a local
+    stand-in server for load tests.
+    """
+    base_urls = base_urls or {}
+    with span("pipeline.run", pipeline=pipeline, file=Path(flac_path).name):
+        if pipeline in ("openai", "openai-edits"):
+            return run_openai_pipeline_from_flac(
+                flac_path,
+                openai_api_key=openai_api_key,
+                timeout_seconds=timeout_seconds,
+                base_url=base_urls.get("openai", OPENAI_BASE_URL),
+                rewrite_protocol="edits" if pipeline == "openai-edits" else "full",
+            )
+        if pipeline == "openai-stream":
+            return run_openai_streaming_pipeline_from_flac(
+                flac_path,
+                openai_api_key=openai_api_key,
+                timeout_seconds=timeout_seconds,
+                base_url=base_urls.get("openai", OPENAI_BASE_URL),
+            )
+        if pipeline in ("groq", "groq-edits"):
+            return run_groq_pipeline_from_flac(
+                flac_path,
+                groq_api_key=groq_api_key,
+                timeout_seconds=timeout_seconds,
+                base_url=base_urls.get("groq", GROQ_BASE_URL),
+                rewrite_protocol="edits" if pipeline == "groq-edits" else "full",
+            )
+        if pipeline in COMPATIBLE_PIPELINES:
+            return run_compatible_pipeline_from_flac(
+                flac_path,
+                config=COMPATIBLE_PIPELINES[pipeline],
+                timeout_seconds=timeout_seconds,
+            )
+    raise ValueError(f"Unknown pipeline id: {pipeline}")
+
+
 def run_selected_pipelines(
     *,
     flac_path: str | Path,
@@ -66,34 +203,309 @@ def run_selected_pipelines(
     flac = str(Path(flac_path).expanduser())
 
     for pipeline in selected:
-        if pipeline == "openai":
-            try:
-                result = run_openai_pipeline_from_flac(
-                    flac,
-                    openai_api_key=openai_api_key,
-                    timeout_seconds=timeout_seconds,
-                )
-                if print_results:
-                    print_pipeline_result(result)
-                results.append(asdict(result))
-            except Exception as exc:  # noqa: BLE001
+        try:
+            result = run_pipeline(
+                pipeline,
+                flac,
+                timeout_seconds=timeout_seconds,
+                openai_api_key=openai_api_key,
+                groq_api_key=groq_api_key,
+            )
+            if print_results:
+                print_pipeline_result(result)
+            results.append(asdict(result))
+        except Exception as exc:  # noqa: BLE001
+            had_error = True
+            print(f"{Path(flac).name} [{pipeline}] failed: {exc}", file=sys.stderr)
+            results.append({"pipeline": pipeline, "flac_path": flac, "error": str(exc)})
+
+    return results, had_error
+
+
+def run_selected_pipelines_batch(
+    *,
+    flac_paths: list[str | Path],
+    selected: list[str],
+    timeout_seconds: float,
+    openai_api_key: str,
+    groq_api_key: str,
+    max_batch_items: int = BATCH_REWRITE_MAX_ITEMS,
+    max_batch_chars: int = BATCH_REWRITE_MAX_CHARS,
+    print_results: bool = True,
+) -> tuple[list[dict], bool]:
+    """Run selected pipelines over many FLAC files with batched rewrites."""
+    had_error = False
+    results: list[dict] = []
+    flacs = [str(Path(flac_path).expanduser()) for flac_path in flac_paths]
+
+    for pipeline in selected:
+        try:
+            if pipeline not in BATCH_PIPELINE_IDS:
+                raise ValueError(f"Pipeline {pipeline} does not support batched rewrites.")
+            with span("pipeline.batch", pipeline=pipeline, files=len(flacs)):
+                if pipeline == "openai":
+                    entries = run_openai_pipeline_batch_from_flacs(
+                        flacs,
+                        openai_api_key=openai_api_key,
+                        timeout_seconds=timeout_seconds,
+                        max_batch_items=max_batch_items,
+                        max_batch_chars=max_batch_chars,
+                    )
+                else:
+                    entries = run_groq_pipeline_batch_from_flacs(
+                        flacs,
+                        groq_api_key=groq_api_key,
+                        timeout_seconds=timeout_seconds,
+                        max_batch_items=max_batch_items,
+                        max_batch_chars=max_batch_chars,
+                    )
+        except Exception as exc:  # noqa: BLE001
+            entries = [exc] * len(flacs)
+
+        for flac, entry in zip(flacs, entries):
+            if isinstance(entry, Exception):
                 had_error = True
-                print(f"{Path(flac).name} [openai] failed: {exc}", file=sys.stderr)
-                results.append({"pipeline": "openai", "flac_path": flac, "error": str(exc)})
+                print(f"{Path(flac).name} [{pipeline}] failed: {entry}", file=sys.stderr)
+                results.append({"pipeline": pipeline, "flac_path": flac, "error": str(entry)})
+                continue
+            if print_results:
+                print_pipeline_result(entry)
+            results.append(asdict(entry))
 
-        if pipeline == "groq":
+    return results, had_error
+
+
+def aggregate_results(results: list[dict]) -> dict[str, dict]:
+    """Per-pipeline totals and derived rates over result dicts.
+
+    Rewrite usage and time shared by a batched request are counted once.
+    """
+    aggregates: dict[str, dict] = {}
+    for result in results:
+        pipeline = result.get("pipeline", "unknown")
+        agg = aggregates.setdefault(
+            pipeline,
+            {
+                "runs": 0,
+                "errors": 0,
+                "audio_seconds": 0.0,
+                "upload_bytes": 0,
+                "transcribe_seconds": 0.0,
+                "rewrite_seconds": 0.0,
+                "rewrite_request_seconds": 0.0,
+                "total_seconds": 0.0,
+                "transcribe_queue_seconds": 0.0,
+                "rewrite_queue_seconds": 0.0,
+                "request_retries": 0,
+                "transcribe_input_tokens": 0.0,
+                "transcribe_output_tokens": 0.0,
+                "rewrite_input_tokens": 0.0,
+                "rewrite_cached_input_tokens": 0.0,
+                "rewrite_output_tokens": 0.0,
+                "rewrite_reasoning_tokens": 0.0,
+                "estimated_cost_usd": 0.0,
+                "rewrite_fallbacks": 0,
+            },
+        )
+        if "error" in result:
+            agg["errors"] += 1
+            continue
+        share = 1.0 / max(result.get("rewrite_batch_size", 1), 1)
+        asr_usage = result.get("transcribe_usage", {})
+        rw_usage = result.get("rewrite_usage", {})
+        agg["runs"] += 1
+        agg["audio_seconds"] += result.get("audio_seconds", 0.0)
+        agg["upload_bytes"] += result.get("upload_bytes", 0)
+        agg["transcribe_seconds"] += result["transcribe_seconds"]
+        agg["rewrite_seconds"] += result["rewrite_seconds"] * share
+        agg["rewrite_request_seconds"] += (
+            result.get("rewrite_request_seconds") or result["rewrite_seconds"]
+        ) * share
+        agg["total_seconds"] += result["transcribe_seconds"] + result["rewrite_seconds"] * share
+        agg["transcribe_queue_seconds"] += result.get("transcribe_queue_seconds", 0.0)
+        agg["rewrite_queue_seconds"] += result.get("rewrite_queue_seconds", 0.0) * share
+        agg["request_retries"] += result.get("request_retries", 0)
+        agg["transcribe_input_tokens"] += asr_usage.get("input_tokens", 0)
+        agg["transcribe_output_tokens"] += asr_usage.get("output_tokens", 0)
+        agg["rewrite_input_tokens"] += rw_usage.get("input_tokens", 0) * share
+        agg["rewrite_cached_input_tokens"] += rw_usage.get("cached_input_tokens", 0) * share
+        agg["rewrite_output_tokens"] += rw_usage.get("output_tokens", 0) * share
+        agg["rewrite_reasoning_tokens"] += rw_usage.get("reasoning_tokens", 0) * share
+        agg["estimated_cost_usd"] += result.get("estimated_cost_usd", 0.0)
+        agg["rewrite_fallbacks"] += int(result.get("rewrite_fallback", False))
+
+    for agg in aggregates.values():
+        agg["rewrite_output_tokens_per_second"] = (
+            agg["rewrite_output_tokens"] / agg["rewrite_request_seconds"]
+            if agg["rewrite_request_seconds"] > 0
+            else 0.0
+        )
+        agg["audio_seconds_per_wall_second"] = (
+            agg["audio_seconds"] / agg["total_seconds"] if agg["total_seconds"] > 0 else 0.0
+        )
+        agg["rewrite_cache_hit_ratio"] = (
+            agg["rewrite_cached_input_tokens"] / agg["rewrite_input_tokens"]
+            if agg["rewrite_input_tokens"] > 0
+            else 0.0
+        )
+    return aggregates
+
+
+@dataclass
+class PipelineStages:
+    asr_model: str
+    rewrite_model: str
+    transcribe: Callable[[Path], tuple[str, TokenUsage]]
+    rewrite: Callable[[str], tuple[str, TokenUsage]]
+    # None: MODEL_PRICING_USD list price; config pipelines pass their own ({} is free).
+    transcribe_pricing: dict[str, float] | None = None
+    rewrite_pricing: dict[str, float] | None = None
+
+
+def live_pipeline_stages(
+    pipeline: str,
+    *,
+    timeout_seconds: float,
+    openai_api_key: str,
+    groq_api_key: str,
+) -> PipelineStages:
+    """Split a pipeline into separate ASR and rewrite calls for live mode."""
+    if pipeline == "openai":
+        if not openai_api_key:
+            raise ValueError("Missing OpenAI API key.")
+        return PipelineStages(
+            asr_model=OPENAI_TRANSCRIBE_MODEL,
+            rewrite_model=OPENAI_REWRITE_MODEL,
+            transcribe=lambda path: post_multipart_transcription(
+                url=f"{OPENAI_BASE_URL}{OPENAI_TRANSCRIBE_PATH}",
+                api_key=openai_api_key,
+                model=OPENAI_TRANSCRIBE_MODEL,
+                flac_path=path,
+                timeout_seconds=timeout_seconds,
+            ),
+            rewrite=lambda text: _openai_rewrite(
+                api_key=openai_api_key,
+                transcript=text,
+                timeout_seconds=timeout_seconds,
+            ),
+        )
+    if pipeline == "groq":
+        if not groq_api_key:
+            raise ValueError("Missing Groq API key.")
+        return PipelineStages(
+            asr_model=GROQ_TRANSCRIBE_MODEL,
+            rewrite_model=GROQ_REWRITE_MODEL,
+            transcribe=lambda path: post_multipart_transcription(
+                url=f"{GROQ_BASE_URL}{GROQ_TRANSCRIBE_PATH}",
+                api_key=groq_api_key,
+                model=GROQ_TRANSCRIBE_MODEL,
+                flac_path=path,
+                timeout_seconds=timeout_seconds,
+            ),
+            rewrite=lambda text: _groq_rewrite(
+                api_key=groq_api_key,
+                transcript=text,
+                timeout_seconds=timeout_seconds,
+            ),
+        )
+    config = COMPATIBLE_PIPELINES.get(pipeline)
+    if config is not None and config.rewrite_protocol == "full":
+        timeout = config.timeout_seconds or timeout_seconds
+        return PipelineStages(
+            asr_model=config.transcribe_model,
+            rewrite_model=config.rewrite_model,
+            transcribe=lambda path: post_multipart_transcription(
+                url=config.transcribe_url,
+                api_key=config.api_key,
+                model=config.transcribe_model,
+                flac_path=path,
+                timeout_seconds=timeout,
+            ),
+            rewrite=lambda text: _compatible_rewrite(
+                config, transcript=text, timeout_seconds=timeout
+            ),
+            transcribe_pricing=config.transcribe_pricing or {},
+            rewrite_pricing=config.rewrite_pricing or {},
+        )
+    raise ValueError(f"Pipeline {pipeline} does not support live segment transcription.")
+
+
+def run_live_pipeline(
+    pipeline: str,
+    flac_path: str | Path,
+    *,
+    live: LiveSegmentTranscriber,
+    stages: PipelineStages,
+) -> PipelineResult:
+    """Finish a live-transcribed recording: join the segment transcripts, then rewrite.
+
+    `transcribe_seconds` is only the ASR time left after recording stopped.
+    If any segment failed, the whole FLAC is transcribed instead.
+    """
+    flac = validate_flac_path(flac_path)
+    start_total = time.perf_counter()
+    with span("pipeline.run", pipeline=pipeline, file=flac.name, live=True):
+        with StageTimer() as asr_timer:
             try:
-                result = run_groq_pipeline_from_flac(
-                    flac,
-                    groq_api_key=groq_api_key,
-                    timeout_seconds=timeout_seconds,
-                )
-                if print_results:
-                    print_pipeline_result(result)
-                results.append(asdict(result))
+                transcript = live.result()
+                raw, asr_usage = transcript.text, transcript.usage
+                segments, upload_bytes = transcript.segments, transcript.upload_bytes
             except Exception as exc:  # noqa: BLE001
-                had_error = True
-                print(f"{Path(flac).name} [groq] failed: {exc}", file=sys.stderr)
-                results.append({"pipeline": "groq", "flac_path": flac, "error": str(exc)})
+                print(
+                    f"{flac.name} [{pipeline}] live transcription failed, "
+                    f"transcribing the whole file: {exc}",
+                    file=sys.stderr,
+                )
+                raw, asr_usage = stages.transcribe(flac)
+                segments, upload_bytes = 1, flac.stat().st_size
+        if not raw:
+            raise ValueError("No speech transcribed.")
+        with StageTimer() as rewrite_timer:
+            rewritten, rewrite_usage = stages.rewrite(raw)
+
+    return PipelineResult(
+        pipeline=pipeline,
+        flac_path=str(flac),
+        asr_model=stages.asr_model,
+        rewrite_model=stages.rewrite_model,
+        raw_transcript=raw,
+        rewritten_text=rewritten,
+        transcribe_seconds=asr_timer.request_seconds,
+        rewrite_seconds=rewrite_timer.request_seconds,
+        total_seconds=time.perf_counter() - start_total,
+        transcribe_segments=segments,
+        audio_seconds=flac_duration_seconds(flac),
+        upload_bytes=upload_bytes,
+        transcribe_queue_seconds=asr_timer.queue_seconds,
+        rewrite_queue_seconds=rewrite_timer.queue_seconds,
+        request_retries=asr_timer.retries + rewrite_timer.retries,
+        transcribe_usage=asr_usage,
+        rewrite_usage=rewrite_usage,
+    ).update_derived_metrics(
+        transcribe_pricing=stages.transcribe_pricing, rewrite_pricing=stages.rewrite_pricing
+    )
+
+
+def run_selected_live_pipelines(
+    *,
+    flac_path: str | Path,
+    live: dict[str, LiveSegmentTranscriber],
+    stages: dict[str, PipelineStages],
+    print_results: bool = True,
+) -> tuple[list[dict], bool]:
+    had_error = False
+    results: list[dict] = []
+    flac = str(Path(flac_path).expanduser())
+
+    for pipeline, transcriber in live.items():
+        try:
+            result = run_live_pipeline(pipeline, flac, live=transcriber, stages=stages[pipeline])
+            if print_results:
+                print_pipeline_result(result)
+            results.append(asdict(result))
+        except Exception as exc:  # noqa: BLE001
+            had_error = True
+            print(f"{Path(flac).name} [{pipeline}] failed: {exc}", file=sys.stderr)
+            results.append({"pipeline": pipeline, "flac_path": flac, "error": str(exc)})
 
     return results, had_error
@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""Shared rate-limit-aware scheduler in front of every provider HTTP call.
+
+Requests are keyed by provider (URL host) and model. Each key has a token
+bucket for pacing (optional, from `--rate-limit`) and a "blocked until" time
+learned from responses: `Retry-After` on 429/503, and the
+`x-ratelimit-remaining-*` / `x-ratelimit-reset-*` headers OpenAI and Groq
+send on every response. Retriable failures (429, 5xx, connection errors) are
+retried with full-jitter exponential backoff.
+
+Time spent waiting in the scheduler (pacing plus backoff) is queue wait, not
+request time; wrap a stage in `StageTimer` to get the two separately.
+"""
+
+from __future__ import annotations
+
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Any
+from urllib.parse import urlsplit
+
+from tracing import instant, span
+
+RETRY_STATUS_CODES = frozenset({408, 429, 500, 502, 503, 504})
+DEFAULT_MAX_RETRIES = 4
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 30.0
+# Never sleep longer than this on a single Retry-After / reset header.
+MAX_SERVER_WAIT_SECONDS = 120.0
+PROVIDER_HOSTS = {
+    "openai": "api.openai.com",
+    "groq": "api.groq.com",
+}
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_duration_seconds(value: str | None) -> float | None:
+    """Parse reset durations such as `1s`, `6m0s`, `7.66s`, `20ms` or plain seconds."""
+    if not value:
+        return None
+    text = value.strip()
+    try:
+        return max(float(text), 0.0)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(text)
+    if not parts or "".join(number + unit for number, unit in parts) != text:
+        return None
+    return sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts)
+
+
+def parse_retry_after(headers: Any) -> float | None:
+    """Seconds to wait from `retry-after-ms` or `Retry-After` (seconds or HTTP date)."""
+    milliseconds = headers.get("retry-after-ms")
+    if milliseconds:
+        try:
+            return max(float(milliseconds) / 1000.0, 0.0)
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def exhausted_reset_seconds(headers: Any) -> float | None:
+    """Time until the request or token budget resets, if either is used up."""
+    waits = []
+    for kind in ("requests", "tokens"):
+        remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+        try:
+            exhausted = remaining is not None and float(remaining) <= 0
+        except ValueError:
+            exhausted = False
+        if exhausted:
+            reset = parse_duration_seconds(headers.get(f"x-ratelimit-reset-{kind}"))
+            if reset is not None:
+                waits.append(reset)
+    return max(waits) if waits else None
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    requests_per_minute: float
+    burst: int = 1
+
+
+def parse_rate_limit_spec(spec: str) -> tuple[str, str | None, RateLimit]:
+    """Parse `PROVIDER[/MODEL]=RPM[:BURST]`, e.g. `groq=30` or `openai/gpt-5-mini=500:10`.
+
+    PROVIDER is an alias from PROVIDER_HOSTS or a host[:port].
+    """
+    target, sep, rate = spec.partition("=")
+    if not sep or not target.strip() or not rate.strip():
+        raise ValueError(f"Rate limit must look like PROVIDER[/MODEL]=RPM[:BURST]: {spec!r}")
+    provider, _, model = target.strip().partition("/")
+    rpm_text, _, burst_text = rate.partition(":")
+    try:
+        limit = RateLimit(float(rpm_text), int(burst_text) if burst_text else 1)
+    except ValueError as exc:
+        raise ValueError(f"Invalid rate in {spec!r}") from exc
+    if limit.requests_per_minute <= 0 or limit.burst < 1:
+        raise ValueError(f"Rate and burst must be positive: {spec!r}")
+    return PROVIDER_HOSTS.get(provider.lower(), provider.lower()), model or None, limit
+
+
+class TokenBucket:
+    """Reservation-style token bucket; callers are served in arrival order."""
+
+    def __init__(self, limit: RateLimit | None):
+        self.rate = limit.requests_per_minute / 60.0 if limit else None
+        self.capacity = float(limit.burst) if limit else 0.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def reserve(self, now: float) -> float:
+        """Take one token and return how long the caller must wait before sending."""
+        wait = max(self.blocked_until - now, 0.0)
+        if self.rate is None:
+            return wait
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1.0
+        if self.tokens < 0:
+            wait = max(wait, -self.tokens / self.rate)
+        return wait
+
+    def block_for(self, seconds: float, now: float) -> None:
+        self.blocked_until = max(self.blocked_until, now + min(seconds, MAX_SERVER_WAIT_SECONDS))
+
+
+_local = threading.local()
+
+
+def _active_timers() -> list[StageTimer]:
+    timers = getattr(_local, "timers", None)
+    if timers is None:
+        timers = _local.timers = []
+    return timers
+
+
+class StageTimer:
+    """Time a block, splitting scheduler queue wait from request time.
+
+    Only scheduler waits on the current thread are counted; timers nest.
+    """
+
+    def __init__(self) -> None:
+        self.wall_seconds = 0.0
+        self.queue_seconds = 0.0
+        self.retries = 0
+        # HTTP 429 responses seen, whether retried or returned to the caller.
+        self.rate_limited = 0
+        self._start = 0.0
+
+    def __enter__(self) -> StageTimer:
+        self._start = time.perf_counter()
+        _active_timers().append(self)
+        return self
+
+    def __exit__(self, *_exc) -> None:
+        self.wall_seconds = time.perf_counter() - self._start
+        _active_timers().remove(self)
+
+    @property
+    def request_seconds(self) -> float:
+        return max(self.wall_seconds - self.queue_seconds, 0.0)
+
+
+def _record_wait(seconds: float, *, retry: bool = False) -> None:
+    for timer in _active_timers():
+        timer.queue_seconds += seconds
+        timer.retries += int(retry)
+
+
+def _record_rate_limited() -> None:
+    for timer in _active_timers():
+        timer.rate_limited += 1
+
+
+def _request_model(kwargs: dict[str, Any]) -> str:
+    for key in ("json", "data"):
+        body = kwargs.get(key)
+        if isinstance(body, dict) and body.get("model"):
+            return str(body["model"])
+    return ""
+
+
+def _rewind_files(kwargs: dict[str, Any]) -> None:
+    for item in (kwargs.get("files") or {}).values():
+        handle = item[1] if isinstance(item, tuple) else item
+        if hasattr(handle, "seek"):
+            handle.seek(0)
+
+
+class RequestScheduler:
+    def __init__(
+        self,
+        *,
+        limits: dict[tuple[str, str | None], RateLimit] | None = None,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        backoff_base_seconds: float = BACKOFF_BASE_SECONDS,
+        backoff_max_seconds: float = BACKOFF_MAX_SECONDS,
+    ):
+        self.limits = dict(limits or {})
+        self.max_retries = max_retries
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self._buckets: dict[tuple[str, str], TokenBucket] = {}
+        self._lock = threading.Lock()
+        self._rng = random.Random()
+
+    def _bucket(self, key: tuple[str, str]) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            provider, model = key
+            limit = self.limits.get((provider, model)) or self.limits.get((provider, None))
+            bucket = self._buckets[key] = TokenBucket(limit)
+        return bucket
+
+    def _wait_turn(self, key: tuple[str, str]) -> None:
+        with self._lock:
+            wait = self._bucket(key).reserve(time.monotonic())
+        if wait > 0:
+            with span("scheduler.wait", provider=key[0], model=key[1]):
+                time.sleep(wait)
+            _record_wait(wait)
+
+    def _observe(self, key: tuple[str, str], headers: Any, retry_after: float | None) -> None:
+        reset = exhausted_reset_seconds(headers)
+        block = max(value for value in (retry_after, reset, 0.0) if value is not None)
+        if block > 0:
+            with self._lock:
+                self._bucket(key).block_for(block, time.monotonic())
+
+    def _backoff(self, attempt: int, retry_after: float | None) -> float:
+        ceiling = min(self.backoff_max_seconds, self.backoff_base_seconds * 2**attempt)
+        with self._lock:
+            jitter = self._rng.uniform(0.0, ceiling)
+        if retry_after is None:
+            return jitter
+        # Spread clients that were all told the same Retry-After.
+        return min(retry_after, MAX_SERVER_WAIT_SECONDS) + jitter * 0.1
+
+    def post(self, url: str, **kwargs: Any):
+        import requests
+
+        key = (urlsplit(url).netloc.lower(), _request_model(kwargs))
+        attempt = 0
+        while True:
+            self._wait_turn(key)
+            _rewind_files(kwargs)
+            try:
+                response = requests.post(url, **kwargs)
+            except requests.ConnectionError as exc:
+                if attempt >= self.max_retries:
+                    raise
+                reason, retry_after = type(exc).__name__, None
+            else:
+                if response.status_code == 429:
+                    _record_rate_limited()
+                retry_after = parse_retry_after(response.headers)
+                self._observe(key, response.headers, retry_after)
+                if response.status_code not in RETRY_STATUS_CODES or attempt >= self.max_retries:
+                    return response
+                reason = str(response.status_code)
+                response.close()
+            delay = self._backoff(attempt, retry_after)
+            attempt += 1
+            instant("scheduler.retry", provider=key[0], model=key[1], reason=reason, attempt=attempt)
+            with span("scheduler.backoff", provider=key[0], model=key[1], seconds=delay):
+                time.sleep(delay)
+            _record_wait(delay, retry=True)
+
+
+_scheduler = RequestScheduler()
+
+
+def get_scheduler() -> RequestScheduler:
+    return _scheduler
+
+
+def configure_scheduler(
+    *,
+    rate_limits: list[str] | None = None,
+    max_retries: int = DEFAULT_MAX_RETRIES,
+) -> RequestScheduler:
+    """Replace the shared scheduler, e.g. from CLI `--rate-limit` / `--max-retries`."""
+    global _scheduler
+    if max_retries < 0:
+        raise ValueError("--max-retries must be >= 0.")
+    limits: dict[tuple[str, str | None], RateLimit] = {}
+    for spec in rate_limits or []:
+        provider, model, limit = parse_rate_limit_spec(spec)
+        limits[(provider, model)] = limit
+    _scheduler = RequestScheduler(limits=limits, max_retries=max_retries)
+    return _scheduler
@@ -8,22 +8,40 @@ import datetime as dt
 import json
 import os
 import sys
+import tempfile
+import time
+from collections.abc import Callable
+from dataclasses import asdict
 from pathlib import Path
+from typing import Any
 
 from env_utils import load_dotenv
 from pipeline_runner_core import (
-    PIPELINE_IDS,
+    DEFAULT_PIPELINE_IDS,
+    aggregate_results,
     available_pipelines_text,
+    live_pipeline_stages,
+    register_pipeline_configs,
     resolve_pipelines,
+    run_selected_live_pipelines,
     run_selected_pipelines,
 )
 from recording_core import (
+    CAPTURE_MODES,
     CHANNELS,
+    ENCODE_MODES,
+    LIVE_SEGMENT_MIN_SECONDS,
+    LIVE_SEGMENT_PAUSE_SECONDS,
+    RESAMPLE_MODES,
     SAMPLE_RATE,
+    RecordingStats,
     list_audio_devices,
+    print_recording_stats,
     record_flac_to_file,
     timestamped_flac_path,
 )
+from rate_limit import DEFAULT_MAX_RETRIES, configure_scheduler
+from tracing import enable_tracing, export_chrome_trace, span
 
 
 def parse_args() -> argparse.Namespace:
@@ -31,7 +49,7 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument(
         "--pipelines",
         nargs="+",
-        default=list(PIPELINE_IDS),
+        default=list(DEFAULT_PIPELINE_IDS),
         help="Pipeline ids to run. Example: --pipelines openai groq",
     )
     parser.add_argument(
@@ -39,6 +57,14 @@ def parse_args() -> argparse.Namespace:
         action="store_true",
         help="List available pipeline ids and exit.",
     )
+    parser.add_argument(
+        "--pipelines-config",
+        default=None,
+        help=(
+            "JSON file defining extra OpenAI-compatible pipelines (default: "
+            "$YADA_PIPELINES_CONFIG, else ./pipelines.json if present)."
+        ),
+    )
     parser.add_argument(
         "--device",
         default=None,
@@ -49,6 +75,57 @@ def parse_args() -> argparse.Namespace:
         action="store_true",
         help="List available audio devices and exit.",
     )
+    parser.add_argument(
+        "--capture-mode",
+        choices=CAPTURE_MODES,
+        default="native",
+        help="native: capture at the device rate/channels and convert in NumPy; "
+        "fixed: ask the host for 16 kHz mono (default: native).",
+    )
+    parser.add_argument(
+        "--resample-mode",
+        choices=RESAMPLE_MODES,
+        default="stream",
+        help="Convert each captured block as it arrives (stream) or once at stop (default: stream).",
+    )
+    parser.add_argument(
+        "--encode-mode",
+        choices=ENCODE_MODES,
+        default=None,
+        help="Encode FLAC on a background thread while recording (incremental) or after stop "
+        "(at-stop). Default: incremental with --resample-mode stream, else at-stop.",
+    )
+    parser.add_argument(
+        "--vad-silence-seconds",
+        type=float,
+        default=None,
+        help="Stop automatically after this much silence following speech "
+        "(e.g. 0.6). Default: off, stop with Enter.",
+    )
+    parser.add_argument(
+        "--vad-threshold-dbfs",
+        type=float,
+        default=None,
+        help="Minimum speech level for --vad-silence-seconds (default: -45).",
+    )
+    parser.add_argument(
+        "--live-segments",
+        action="store_true",
+        help="Cut the recording at pauses and transcribe each segment in the background "
+        "while recording continues (needs incremental encoding).",
+    )
+    parser.add_argument(
+        "--segment-pause-seconds",
+        type=float,
+        default=LIVE_SEGMENT_PAUSE_SECONDS,
+        help=f"Pause length that ends a live segment (default: {LIVE_SEGMENT_PAUSE_SECONDS}).",
+    )
+    parser.add_argument(
+        "--segment-min-seconds",
+        type=float,
+        default=LIVE_SEGMENT_MIN_SECONDS,
+        help=f"Shortest live segment worth a separate request (default: {LIVE_SEGMENT_MIN_SECONDS}).",
+    )
     parser.add_argument(
         "--audio-dir",
         default="audio",
@@ -59,12 +136,33 @@ def parse_args() -> argparse.Namespace:
         default="runs",
         help="Directory for JSON run artifacts.",
     )
+    parser.add_argument(
+        "--rate-limit",
+        action="append",
+        default=[],
+        metavar="PROVIDER[/MODEL]=RPM[:BURST]",
+        help="Pace requests with a token bucket, e.g. groq=30 or openai/gpt-5-mini=500:10 (repeatable).",
+    )
+    parser.add_argument(
+        "--max-retries",
+        type=int,
+        default=DEFAULT_MAX_RETRIES,
+        help=(
+            "Retries per request on 429/5xx/connection errors, honouring Retry-After "
+            f"(default: {DEFAULT_MAX_RETRIES})."
+        ),
+    )
     parser.add_argument(
         "--timeout-seconds",
         type=float,
         default=180.0,
         help="Per-request timeout.",
     )
+    parser.add_argument(
+        "--trace-file",
+        default=None,
+        help="Record stage spans and write a Chrome trace-event JSON file (open in Perfetto).",
+    )
     return parser.parse_args()
 
 
@@ -73,6 +171,8 @@ def write_results_json(
     args: argparse.Namespace,
     selected: list[str],
     flac_path: Path,
+    recording: RecordingStats,
+    stop_to_upload_start_seconds: float,
     results: list[dict],
 ) -> Path:
     out_dir = Path(args.output_dir).expanduser().resolve()
@@ -84,6 +184,10 @@ def write_results_json(
         "recorded_flac": str(flac_path),
         "pipelines": selected,
         "audio_format": {"sample_rate": SAMPLE_RATE, "channels": CHANNELS},
+        "live_segments": args.live_segments,
+        "recording": asdict(recording),
+        "stop_to_upload_start_seconds": stop_to_upload_start_seconds,
+        "aggregates": aggregate_results(results),
         "results": results,
     }
     artifact.write_text(json.dumps(payload, indent=2), encoding="utf-8")
@@ -92,6 +196,18 @@ def write_results_json(
 
 def main() -> int:
     args = parse_args()
+    if args.trace_file:
+        enable_tracing()
+    try:
+        register_pipeline_configs(args.pipelines_config)
+    except Exception as exc:  # noqa: BLE001
+        print(f"Pipelines config error: {exc}", file=sys.stderr)
+        return 2
+    try:
+        configure_scheduler(rate_limits=args.rate_limit, max_retries=args.max_retries)
+    except ValueError as exc:
+        print(f"Input error: {exc}", file=sys.stderr)
+        return 2
     if args.list_pipelines:
         print(available_pipelines_text())
         return 0
@@ -105,32 +221,108 @@ def main() -> int:
         print(f"Input error: {exc}", file=sys.stderr)
         return 2
 
-    audio_dir = Path(args.audio_dir).expanduser().resolve()
-    flac_path = timestamped_flac_path(audio_dir=audio_dir, prefix="mic")
-
-    try:
-        record_flac_to_file(output_file=flac_path, device=args.device)
-    except Exception as exc:  # noqa: BLE001
-        print(f"Recording failed: {exc}", file=sys.stderr)
-        return 1
-
     project_root = Path(__file__).resolve().parents[1]
     load_dotenv([Path.cwd() / ".env", project_root / ".env"])
     openai_api_key = os.getenv("OPENAI_API_KEY", "")
     groq_api_key = os.getenv("GROQ_API_KEY", "")
 
-    results, had_error = run_selected_pipelines(
-        flac_path=flac_path,
-        selected=selected,
-        timeout_seconds=args.timeout_seconds,
-        openai_api_key=openai_api_key,
-        groq_api_key=groq_api_key,
-        print_results=True,
-    )
+    audio_dir = Path(args.audio_dir).expanduser().resolve()
+    flac_path = timestamped_flac_path(audio_dir=audio_dir, prefix="mic")
+
+    stages = {}
+    if args.live_segments:
+        try:
+            stages = {
+                pipeline: live_pipeline_stages(
+                    pipeline,
+                    timeout_seconds=args.timeout_seconds,
+                    openai_api_key=openai_api_key,
+                    groq_api_key=groq_api_key,
+                )
+                for pipeline in selected
+            }
+        except Exception as exc:  # noqa: BLE001
+            print(f"Input error: {exc}", file=sys.stderr)
+            return 2
+
+    with tempfile.TemporaryDirectory(prefix="yada-segments-") as segment_dir:
+        live = {}
+        on_segment: Callable[[Any], None] | None = None
+        if args.live_segments:
+            from live_transcription import LiveSegmentTranscriber, write_segment_flac
+
+            live = {
+                pipeline: LiveSegmentTranscriber(stage.transcribe)
+                for pipeline, stage in stages.items()
+            }
+
+            def submit_segment(segment) -> None:
+                path = None
+                try:
+                    if segment.has_speech:
+                        path = Path(segment_dir) / f"segment-{segment.index:03d}.flac"
+                        write_segment_flac(segment.audio, path)
+                except Exception as exc:  # noqa: BLE001
+                    for transcriber in live.values():
+                        transcriber.fail(segment.index, exc)
+                    return
+                for transcriber in live.values():
+                    transcriber.submit(segment.index, path)
+
+            on_segment = submit_segment
+
+        try:
+            stats = record_flac_to_file(
+                output_file=flac_path,
+                device=args.device,
+                capture_mode=args.capture_mode,
+                resample_mode=args.resample_mode,
+                encode_mode=args.encode_mode,
+                vad_silence_seconds=args.vad_silence_seconds,
+                vad_threshold_dbfs=args.vad_threshold_dbfs,
+                on_segment=on_segment,
+                segment_pause_seconds=args.segment_pause_seconds,
+                segment_min_seconds=args.segment_min_seconds,
+            )
+        except Exception as exc:  # noqa: BLE001
+            for transcriber in live.values():
+                transcriber.close()
+            print(f"Recording failed: {exc}", file=sys.stderr)
+            return 1
+        print_recording_stats(stats)
+
+        stop_to_upload_start = time.perf_counter() - stats.stopped_at
+        print(f"Stop-to-upload-start: {stop_to_upload_start * 1000:.1f}ms")
+        if live:
+            results, had_error = run_selected_live_pipelines(
+                flac_path=flac_path,
+                live=live,
+                stages=stages,
+                print_results=True,
+            )
+        else:
+            results, had_error = run_selected_pipelines(
+                flac_path=flac_path,
+                selected=selected,
+                timeout_seconds=args.timeout_seconds,
+                openai_api_key=openai_api_key,
+                groq_api_key=groq_api_key,
+                print_results=True,
+            )
 
-    artifact = write_results_json(args=args, selected=selected, flac_path=flac_path, results=results)
+    with span("artifact.write"):
+        artifact = write_results_json(
+            args=args,
+            selected=selected,
+            flac_path=flac_path,
+            recording=stats,
+            stop_to_upload_start_seconds=stop_to_upload_start,
+            results=results,
+        )
     print(f"\nSaved FLAC: {flac_path}")
     print(f"Saved artifact: {artifact}")
+    if args.trace_file:
+        print(f"Saved trace: {export_chrome_trace(args.trace_file)}")
     return 1 if had_error else 0
 
 
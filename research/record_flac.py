@@ -8,9 +8,13 @@ import sys
 from pathlib import Path
 
 from recording_core import (
+    CAPTURE_MODES,
     CHANNELS,
+    ENCODE_MODES,
+    RESAMPLE_MODES,
     SAMPLE_RATE,
     list_audio_devices,
+    print_recording_stats,
     record_flac_to_file,
     timestamped_flac_path,
 )
@@ -28,6 +32,39 @@ def parse_args() -> argparse.Namespace:
         action="store_true",
         help="List available audio devices and exit.",
     )
+    parser.add_argument(
+        "--capture-mode",
+        choices=CAPTURE_MODES,
+        default="native",
+        help="native: capture at the device rate/channels and convert in NumPy; "
+        "fixed: ask the host for 16 kHz mono (default: native).",
+    )
+    parser.add_argument(
+        "--resample-mode",
+        choices=RESAMPLE_MODES,
+        default="stream",
+        help="Convert each captured block as it arrives (stream) or once at stop (default: stream).",
+    )
+    parser.add_argument(
+        "--encode-mode",
+        choices=ENCODE_MODES,
+        default=None,
+        help="Encode FLAC on a background thread while recording (incremental) or after stop "
+        "(at-stop). Default: incremental with --resample-mode stream, else at-stop.",
+    )
+    parser.add_argument(
+        "--vad-silence-seconds",
+        type=float,
+        default=None,
+        help="Stop automatically after this much silence following speech "
+        "(e.g. 0.6). Default: off, stop with Enter.",
+    )
+    parser.add_argument(
+        "--vad-threshold-dbfs",
+        type=float,
+        default=None,
+        help="Minimum speech level for --vad-silence-seconds (default: -45).",
+    )
     parser.add_argument(
         "--audio-dir",
         default="audio",
@@ -54,13 +91,22 @@ def main() -> int:
         output_file = timestamped_flac_path(audio_dir=audio_dir, prefix="mic")
 
     try:
-        record_flac_to_file(output_file=output_file, device=args.device)
+        stats = record_flac_to_file(
+            output_file=output_file,
+            device=args.device,
+            capture_mode=args.capture_mode,
+            resample_mode=args.resample_mode,
+            encode_mode=args.encode_mode,
+            vad_silence_seconds=args.vad_silence_seconds,
+            vad_threshold_dbfs=args.vad_threshold_dbfs,
+        )
     except Exception as exc:  # noqa: BLE001
         print(f"Recording failed: {exc}", file=sys.stderr)
         return 1
 
     print(f"\nSaved FLAC: {output_file}")
     print(f"Audio format: {SAMPLE_RATE} Hz, {CHANNELS} channel")
+    print_recording_stats(stats)
     return 0
 
 
@@ -3,13 +3,61 @@
 
 from __future__ import annotations
 
+import contextlib
 import datetime as dt
+import queue
 import sys
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Any
+
+from tracing import instant, span
 
 SAMPLE_RATE = 16000
 CHANNELS = 1
 
+# native: open the device at its default rate/channels and convert in NumPy.
+# fixed: ask PortAudio for SAMPLE_RATE/CHANNELS directly.
+CAPTURE_MODES = ("native", "fixed")
+# stream: downmix/resample each callback block; stop: convert once at stop.
+RESAMPLE_MODES = ("stream", "stop")
+# incremental: encode FLAC on a background thread while recording;
+# at-stop: concatenate and encode the whole recording after stop.
+ENCODE_MODES = ("incremental", "at-stop")
+# Live segmentation: cut at pauses this long, into segments at least this long.
+LIVE_SEGMENT_PAUSE_SECONDS = 0.5
+LIVE_SEGMENT_MIN_SECONDS = 5.0
+
+
+@dataclass
+class RecordingStats:
+    output_file: str
+    capture_sample_rate: int
+    capture_channels: int
+    sample_rate: int
+    channels: int
+    capture_mode: str
+    resample_mode: str
+    encode_mode: str
+    audio_seconds: float
+    capture_seconds: float
+    overflows: int
+    status_events: int
+    dsp_seconds: float
+    encode_seconds: float
+    max_encoder_backlog: int
+    process_cpu_seconds: float
+    # perf_counter() when capture stopped, and how long until the FLAC was final.
+    stopped_at: float
+    stop_to_ready_seconds: float
+    # "enter", or "vad" when the endpointer stopped capture after speech ended.
+    stop_reason: str = "enter"
+    # Segments handed to `on_segment` in live mode (including the final one).
+    live_segments: int = 0
+
 
 def timestamped_flac_path(audio_dir: Path, prefix: str = "mic") -> Path:
     stamp = dt.datetime.now().strftime("%Y%m%d-%H%M%S")
@@ -35,34 +83,341 @@ def list_audio_devices() -> str:
     return str(sd.query_devices())
 
 
-def record_flac_to_file(*, output_file: Path, device: str | int | None = None) -> Path:
+def query_input_format(device: str | int | None = None) -> tuple[int, int]:
+    """Return the device's native (sample_rate, channels) for input."""
+    _, sd, _ = load_audio_libs()
+    info = sd.query_devices(device, "input")
+    return int(round(info["default_samplerate"])), max(int(info["max_input_channels"]), 1)
+
+
+class BackgroundFlacEncoder:
+    """Converts and FLAC-encodes captured blocks on a worker thread.
+
+    The audio callback only enqueues raw blocks; by the time recording stops,
+    everything but the last few blocks is already encoded on disk.
+    """
+
+    def __init__(self, np, sf, output_file: Path, convert, flush=None):
+        self._np = np
+        self._convert = convert
+        self._flush = flush
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._file = sf.SoundFile(
+            str(output_file),
+            mode="w",
+            samplerate=SAMPLE_RATE,
+            channels=CHANNELS,
+            format="FLAC",
+            subtype="PCM_16",
+        )
+        self._thread = threading.Thread(target=self._run, name="flac-encoder", daemon=True)
+        self.frames = 0
+        self.dsp_seconds = 0.0
+        self.encode_seconds = 0.0
+        self.max_backlog = 0
+        self.error: BaseException | None = None
+        self._thread.start()
+
+    def submit(self, block) -> None:
+        self._queue.put(block)
+
+    def _write(self, audio) -> None:
+        start = time.perf_counter()
+        self._file.write(audio)
+        self.encode_seconds += time.perf_counter() - start
+        self.frames += len(audio)
+
+    def _run(self) -> None:
+        done = False
+        while not done:
+            # Take everything queued so far and encode it as one larger write.
+            blocks = [self._queue.get()]
+            while not self._queue.empty():
+                blocks.append(self._queue.get())
+            if blocks[-1] is None:
+                blocks.pop()
+                done = True
+            self.max_backlog = max(self.max_backlog, len(blocks))
+            if self.error is not None or not blocks:
+                continue
+            try:
+                with span("recording.encode_blocks", blocks=len(blocks)):
+                    start = time.perf_counter()
+                    audio = self._convert(
+                        self._np.concatenate(blocks) if len(blocks) > 1 else blocks[0]
+                    )
+                    self.dsp_seconds += time.perf_counter() - start
+                    self._write(audio)
+            except BaseException as exc:  # noqa: BLE001
+                self.error = exc
+
+    def close(self) -> None:
+        """Drain the queue, write the converter's flushed tail and finalize the file."""
+        self._queue.put(None)
+        self._thread.join()
+        try:
+            if self.error is None and self._flush is not None:
+                self._write(self._flush())
+        finally:
+            self._file.close()
+        if self.error is not None:
+            raise RuntimeError(f"Background FLAC encoding failed: {self.error}") from self.error
+
+
+class _StopSignal:
+    """Set by whichever of Enter or the VAD fires first; that one is the stop reason."""
+
+    def __init__(self) -> None:
+        self.reason: str | None = None
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+
+    def set(self, reason: str) -> None:
+        with self._lock:
+            if self.reason is None:
+                self.reason = reason
+                self._event.set()
+
+    def wait(self) -> str:
+        # Short timeouts keep Ctrl+C responsive on every platform.
+        while not self._event.wait(0.1):
+            pass
+        return self.reason or "enter"
+
+
+def _watch_enter(stop: _StopSignal) -> None:
+    """Daemon thread body: signal "enter" on the next stdin line.
+
+    If stdin is closed (e.g. a non-interactive run), only the VAD can stop.
+    After a VAD stop the thread stays blocked on stdin and takes the next line.
+    """
+    try:
+        line = sys.stdin.readline()
+    except (OSError, ValueError):
+        return
+    if line:
+        stop.set("enter")
+
+
+def record_flac_to_file(
+    *,
+    output_file: Path,
+    device: str | int | None = None,
+    capture_mode: str = "native",
+    resample_mode: str = "stream",
+    encode_mode: str | None = None,
+    vad_silence_seconds: float | None = None,
+    vad_threshold_dbfs: float | None = None,
+    on_segment: Callable[[Any], None] | None = None,
+    segment_pause_seconds: float = LIVE_SEGMENT_PAUSE_SECONDS,
+    segment_min_seconds: float = LIVE_SEGMENT_MIN_SECONDS,
+) -> RecordingStats:
+    """Record until Enter, or until end of speech when `vad_silence_seconds` is set.
+
+    With `on_segment`, the converted audio is also cut at pauses and each
+    completed `audio_dsp.SpeechSegment` is passed to `on_segment` on the
+    encoder thread while recording continues; the final segment is delivered
+    during stop, before this function returns.
+    """
     np, sd, sf = load_audio_libs()
+    from audio_dsp import (
+        VAD_THRESHOLD_DBFS,
+        PauseSegmenter,
+        PolyphaseResampler,
+        SpeechEndpointer,
+        downmix,
+    )
+
+    if capture_mode not in CAPTURE_MODES:
+        raise ValueError(f"Unknown capture mode: {capture_mode}")
+    if resample_mode not in RESAMPLE_MODES:
+        raise ValueError(f"Unknown resample mode: {resample_mode}")
+    if encode_mode is None:
+        encode_mode = "incremental" if resample_mode == "stream" else "at-stop"
+    if encode_mode not in ENCODE_MODES:
+        raise ValueError(f"Unknown encode mode: {encode_mode}")
+    if encode_mode == "incremental" and resample_mode != "stream":
+        raise ValueError("Incremental encoding requires the stream resample mode.")
+    if on_segment is not None and encode_mode != "incremental":
+        raise ValueError("Live segmentation requires incremental encoding.")
     output_file.parent.mkdir(parents=True, exist_ok=True)
 
+    if capture_mode == "native":
+        capture_rate, capture_channels = query_input_format(device)
+    else:
+        capture_rate, capture_channels = SAMPLE_RATE, CHANNELS
+    resampler = PolyphaseResampler(capture_rate, SAMPLE_RATE)
+    convert_in_callback = resample_mode == "stream"
+    threshold_dbfs = VAD_THRESHOLD_DBFS if vad_threshold_dbfs is None else vad_threshold_dbfs
+    endpointer = None
+    if vad_silence_seconds is not None:
+        endpointer = SpeechEndpointer(
+            capture_rate, silence_seconds=vad_silence_seconds, threshold_dbfs=threshold_dbfs
+        )
+    segmenter = None
+    if on_segment is not None:
+        segmenter = PauseSegmenter(
+            SAMPLE_RATE,
+            on_segment,
+            pause_seconds=segment_pause_seconds,
+            min_segment_seconds=segment_min_seconds,
+            threshold_dbfs=threshold_dbfs,
+        )
+
     print(f"Recording to: {output_file}")
+    print(f"Capture format: {capture_rate} Hz, {capture_channels} channel(s)")
     print(f"Audio format: {SAMPLE_RATE} Hz, mono")
     print("Press Enter to start recording.")
     input()
-    print("Recording... Press Enter to stop.")
+    if endpointer is not None:
+        print(f"Recording... stops after {vad_silence_seconds:.2f}s of silence, or press Enter.")
+    else:
+        print("Recording... Press Enter to stop.")
     chunks = []
+    counters = {"overflows": 0, "status_events": 0, "dsp_seconds": 0.0, "vad_seconds": 0.0}
+    # With the VAD on, the callback downmixes each block once and shares the
+    # mono block with the converter instead of mixing it twice.
+    premixed = endpointer is not None
+    encoder = None
+    if encode_mode == "incremental":
+
+        def convert(block):
+            audio = resampler.process(block if premixed else downmix(block))
+            if segmenter is not None:
+                segmenter.feed(audio)
+            return audio
+
+        def flush():
+            tail = resampler.flush()
+            if segmenter is not None:
+                segmenter.feed(tail)
+                segmenter.finish()
+            return tail
+
+        encoder = BackgroundFlacEncoder(np, sf, output_file, convert, flush)
 
     def callback(indata, _frames, _time, status):
         if status:
+            counters["status_events"] += 1
+            if status.input_overflow:
+                counters["overflows"] += 1
             print(f"Audio status: {status}", file=sys.stderr)
-        chunks.append(indata.copy())
+        mono = None
+        if premixed:
+            start = time.perf_counter()
+            mono = downmix(indata)
+            counters["vad_seconds"] += time.perf_counter() - start
+        if encoder is not None:
+            encoder.submit(mono if mono is not None else indata.copy())
+        elif convert_in_callback:
+            start = time.perf_counter()
+            chunks.append(resampler.process(mono if mono is not None else downmix(indata)))
+            counters["dsp_seconds"] += time.perf_counter() - start
+        else:
+            chunks.append(indata.copy())
+        if endpointer is not None and not endpointer.ended:
+            start = time.perf_counter()
+            if endpointer.process(mono):
+                stop.set("vad")
+            counters["vad_seconds"] += time.perf_counter() - start
+
+    stop = _StopSignal()
+    stop_reason = "enter"
+    cpu_start = time.process_time()
+    capture_start = time.perf_counter()
+    try:
+        with span("recording.capture"), sd.InputStream(
+            samplerate=capture_rate,
+            channels=capture_channels,
+            dtype="float32",
+            device=device,
+            callback=callback,
+        ):
+            if endpointer is not None:
+                threading.Thread(
+                    target=_watch_enter, args=(stop,), name="recording-enter", daemon=True
+                ).start()
+                stop_reason = stop.wait()
+            else:
+                input()
+    except BaseException:
+        if encoder is not None:
+            with contextlib.suppress(Exception):
+                encoder.close()
+        raise
+    stopped_at = time.perf_counter()
+    capture_seconds = stopped_at - capture_start
+    instant("recording.stop", reason=stop_reason)
+    if stop_reason == "vad":
+        print("End of speech detected.")
+
+    encode_seconds = 0.0
+    max_backlog = 0
+    if encoder is not None:
+        with span("recording.drain_encoder"):
+            encoder.close()
+        frames = encoder.frames
+        counters["dsp_seconds"] += encoder.dsp_seconds
+        encode_seconds = encoder.encode_seconds
+        max_backlog = encoder.max_backlog
+        if not frames:
+            output_file.unlink(missing_ok=True)
+            raise RuntimeError("No audio captured from microphone.")
+    else:
+        if not chunks:
+            raise RuntimeError("No audio captured from microphone.")
 
-    with sd.InputStream(
-        samplerate=SAMPLE_RATE,
+        start = time.perf_counter()
+        with span("recording.convert"):
+            if convert_in_callback:
+                chunks.append(resampler.flush())
+                audio = np.concatenate(chunks)
+            else:
+                audio = downmix(np.concatenate(chunks, axis=0))
+                audio = np.concatenate((resampler.process(audio), resampler.flush()))
+        counters["dsp_seconds"] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        with span("recording.encode"):
+            sf.write(str(output_file), audio, SAMPLE_RATE, format="FLAC", subtype="PCM_16")
+        encode_seconds = time.perf_counter() - start
+        frames = len(audio)
+
+    return RecordingStats(
+        output_file=str(output_file),
+        capture_sample_rate=capture_rate,
+        capture_channels=capture_channels,
+        sample_rate=SAMPLE_RATE,
         channels=CHANNELS,
-        dtype="float32",
-        device=device,
-        callback=callback,
-    ):
-        input()
-
-    if not chunks:
-        raise RuntimeError("No audio captured from microphone.")
-
-    audio = np.concatenate(chunks, axis=0)
-    sf.write(str(output_file), audio, SAMPLE_RATE, format="FLAC", subtype="PCM_16")
-    return output_file
+        capture_mode=capture_mode,
+        resample_mode=resample_mode,
+        encode_mode=encode_mode,
+        audio_seconds=frames / SAMPLE_RATE,
+        capture_seconds=capture_seconds,
+        overflows=counters["overflows"],
+        status_events=counters["status_events"],
+        dsp_seconds=counters["dsp_seconds"] + counters["vad_seconds"],
+        encode_seconds=encode_seconds,
+        max_encoder_backlog=max_backlog,
+        process_cpu_seconds=time.process_time() - cpu_start,
+        stopped_at=stopped_at,
+        stop_to_ready_seconds=time.perf_counter() - stopped_at,
+        stop_reason=stop_reason,
+        live_segments=segmenter.segments if segmenter is not None else 0,
+    )
+
+
+def print_recording_stats(stats: RecordingStats) -> None:
+    print(
+        f"Capture: {stats.capture_sample_rate} Hz x{stats.capture_channels} -> "
+        f"{stats.sample_rate} Hz x{stats.channels} "
+        f"({stats.capture_mode}, {stats.resample_mode}, {stats.encode_mode}) "
+        f"stopped by {stats.stop_reason}"
+    )
+    print(
+        f"  audio={stats.audio_seconds:.2f}s dsp={stats.dsp_seconds * 1000:.1f}ms "
+        f"encode={stats.encode_seconds * 1000:.1f}ms "
+        f"stop_to_ready={stats.stop_to_ready_seconds * 1000:.1f}ms "
+        f"cpu={stats.process_cpu_seconds:.2f}s overflows={stats.overflows} "
+        f"status_events={stats.status_events}"
+    )
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""Utility: run selected speech pipelines over a corpus of FLAC files."""
+
+from __future__ import annotations
+
+import argparse
+import datetime as dt
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+from env_utils import load_dotenv
+from pipeline_common import BATCH_REWRITE_MAX_CHARS, BATCH_REWRITE_MAX_ITEMS, collect_flac_paths
+from pipeline_runner_core import (
+    DEFAULT_PIPELINE_IDS,
+    aggregate_results,
+    available_pipelines_text,
+    register_pipeline_configs,
+    resolve_pipelines,
+    run_selected_pipelines,
+    run_selected_pipelines_batch,
+)
+from rate_limit import DEFAULT_MAX_RETRIES, configure_scheduler
+from tracing import enable_tracing, export_chrome_trace, span
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run speech pipelines on a corpus of .flac files.")
+    parser.add_argument(
+        "inputs",
+        nargs="*",
+        help="FLAC files and/or directories containing .flac files.",
+    )
+    parser.add_argument(
+        "--corpus-cache",
+        default=None,
+        help="Replay the cached FLAC payloads of a corpus built with build_corpus_cache.py.",
+    )
+    parser.add_argument(
+        "--pipelines",
+        nargs="+",
+        default=list(DEFAULT_PIPELINE_IDS),
+        help="Pipeline ids to run. Example: --pipelines openai groq",
+    )
+    parser.add_argument(
+        "--list-pipelines",
+        action="store_true",
+        help="List available pipeline ids and exit.",
+    )
+    parser.add_argument(
+        "--pipelines-config",
+        default=None,
+        help=(
+            "JSON file defining extra OpenAI-compatible pipelines (default: "
+            "$YADA_PIPELINES_CONFIG, else ./pipelines.json if present)."
+        ),
+    )
+    parser.add_argument(
+        "--batch-rewrite",
+        action="store_true",
+        help="Pack many transcripts into each rewrite request (throughput mode).",
+    )
+    parser.add_argument(
+        "--batch-max-items",
+        type=int,
+        default=BATCH_REWRITE_MAX_ITEMS,
+        help=f"Max transcripts per batched rewrite request (default: {BATCH_REWRITE_MAX_ITEMS}).",
+    )
+    parser.add_argument(
+        "--batch-max-chars",
+        type=int,
+        default=BATCH_REWRITE_MAX_CHARS,
+        help=f"Max transcript characters per batched rewrite request (default: {BATCH_REWRITE_MAX_CHARS}).",
+    )
+    parser.add_argument(
+        "--timeout-seconds",
+        type=float,
+        default=180.0,
+        help="Per-request timeout.",
+    )
+    parser.add_argument(
+        "--rate-limit",
+        action="append",
+        default=[],
+        metavar="PROVIDER[/MODEL]=RPM[:BURST]",
+        help="Pace requests with a token bucket, e.g. groq=30 or openai/gpt-5-mini=500:10 (repeatable).",
+    )
+    parser.add_argument(
+        "--max-retries",
+        type=int,
+        default=DEFAULT_MAX_RETRIES,
+        help=(
+            "Retries per request on 429/5xx/connection errors, honouring Retry-After "
+            f"(default: {DEFAULT_MAX_RETRIES})."
+        ),
+    )
+    parser.add_argument(
+        "--output-dir",
+        default="runs",
+        help="Directory for JSON result artifacts.",
+    )
+    parser.add_argument(
+        "--trace-file",
+        default=None,
+        help="Record stage spans and write a Chrome trace-event JSON file (open in Perfetto).",
+    )
+    return parser.parse_args()
+
+
+def write_results_json(
+    *,
+    args: argparse.Namespace,
+    selected: list[str],
+    flac_paths: list[Path],
+    wall_seconds: float,
+    results: list[dict],
+) -> Path:
+    output_dir = Path(args.output_dir).expanduser().resolve()
+    output_dir.mkdir(parents=True, exist_ok=True)
+    stamp = dt.datetime.now().strftime("%Y%m%d-%H%M%S")
+    output_path = output_dir / f"corpus-run-{stamp}.json"
+    payload = {
+        "created_at": dt.datetime.now(dt.timezone.utc).isoformat(),
+        "pipelines": selected,
+        "batch_rewrite": args.batch_rewrite,
+        "rate_limits": args.rate_limit,
+        "max_retries": args.max_retries,
+        "source_flacs": [str(path) for path in flac_paths],
+        "wall_seconds": wall_seconds,
+        "aggregates": aggregate_results(results),
+        "results": results,
+    }
+    output_path.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+    return output_path
+
+
+def main() -> int:
+    args = parse_args()
+    if args.trace_file:
+        enable_tracing()
+    try:
+        register_pipeline_configs(args.pipelines_config)
+    except Exception as exc:  # noqa: BLE001
+        print(f"Pipelines config error: {exc}", file=sys.stderr)
+        return 2
+    try:
+        configure_scheduler(rate_limits=args.rate_limit, max_retries=args.max_retries)
+    except ValueError as exc:
+        print(f"Input error: {exc}", file=sys.stderr)
+        return 2
+    if args.list_pipelines:
+        print(available_pipelines_text())
+        return 0
+
+    flac_paths = collect_flac_paths(args.inputs)
+    if args.corpus_cache:
+        from corpus_cache import CorpusCache
+
+        try:
+            flac_paths.extend(CorpusCache(args.corpus_cache).payload_paths("flac"))
+        except Exception as exc:  # noqa: BLE001
+            print(f"Corpus cache error: {exc}", file=sys.stderr)
+            return 2
+    if not flac_paths:
+        print("No .flac inputs found.", file=sys.stderr)
+        return 2
+    if args.batch_max_items < 1 or args.batch_max_chars < 1:
+        print("--batch-max-items and --batch-max-chars must be positive.", file=sys.stderr)
+        return 2
+
+    try:
+        selected = resolve_pipelines(args.pipelines)
+    except Exception as exc:  # noqa: BLE001
+        print(f"Input error: {exc}", file=sys.stderr)
+        return 2
+
+    project_root = Path(__file__).resolve().parents[1]
+    load_dotenv([Path.cwd() / ".env", project_root / ".env"])
+    openai_api_key = os.getenv("OPENAI_API_KEY", "")
+    groq_api_key = os.getenv("GROQ_API_KEY", "")
+
+    start = time.perf_counter()
+    if args.batch_rewrite:
+        results, had_error = run_selected_pipelines_batch(
+            flac_paths=flac_paths,
+            selected=selected,
+            timeout_seconds=args.timeout_seconds,
+            openai_api_key=openai_api_key,
+            groq_api_key=groq_api_key,
+            max_batch_items=args.batch_max_items,
+            max_batch_chars=args.batch_max_chars,
+            print_results=True,
+        )
+    else:
+        results = []
+        had_error = False
+        for flac_path in flac_paths:
+            file_results, file_error = run_selected_pipelines(
+                flac_path=flac_path,
+                selected=selected,
+                timeout_seconds=args.timeout_seconds,
+                openai_api_key=openai_api_key,
+                groq_api_key=groq_api_key,
+                print_results=True,
+            )
+            results.extend(file_results)
+            had_error = had_error or file_error
+    wall_seconds = time.perf_counter() - start
+
+    with span("artifact.write"):
+        output_path = write_results_json(
+            args=args,
+            selected=selected,
+            flac_paths=flac_paths,
+            wall_seconds=wall_seconds,
+            results=results,
+        )
+    print(f"\nProcessed {len(flac_paths)} file(s) in {wall_seconds:.2f}s")
+    print(f"Saved results: {output_path}")
+    if args.trace_file:
+        print(f"Saved trace: {export_chrome_trace(args.trace_file)}")
+    return 1 if had_error else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
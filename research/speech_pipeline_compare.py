@@ -12,11 +12,15 @@ from pathlib import Path
 
 from env_utils import load_dotenv
 from pipeline_runner_core import (
-    PIPELINE_IDS,
+    DEFAULT_PIPELINE_IDS,
+    aggregate_results,
     available_pipelines_text,
+    register_pipeline_configs,
     resolve_pipelines,
     run_selected_pipelines,
 )
+from rate_limit import DEFAULT_MAX_RETRIES, configure_scheduler
+from tracing import enable_tracing, export_chrome_trace, span
 
 
 def parse_args() -> argparse.Namespace:
@@ -25,7 +29,7 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument(
         "--pipelines",
         nargs="+",
-        default=list(PIPELINE_IDS),
+        default=list(DEFAULT_PIPELINE_IDS),
         help="Pipeline ids to run. Example: --pipelines openai groq",
     )
     parser.add_argument(
@@ -33,6 +37,30 @@ def parse_args() -> argparse.Namespace:
         action="store_true",
         help="List available pipeline ids and exit.",
     )
+    parser.add_argument(
+        "--pipelines-config",
+        default=None,
+        help=(
+            "JSON file defining extra OpenAI-compatible pipelines (default: "
+            "$YADA_PIPELINES_CONFIG, else ./pipelines.json if present)."
+        ),
+    )
+    parser.add_argument(
+        "--rate-limit",
+        action="append",
+        default=[],
+        metavar="PROVIDER[/MODEL]=RPM[:BURST]",
+        help="Pace requests with a token bucket, e.g. groq=30 or openai/gpt-5-mini=500:10 (repeatable).",
+    )
+    parser.add_argument(
+        "--max-retries",
+        type=int,
+        default=DEFAULT_MAX_RETRIES,
+        help=(
+            "Retries per request on 429/5xx/connection errors, honouring Retry-After "
+            f"(default: {DEFAULT_MAX_RETRIES})."
+        ),
+    )
     parser.add_argument(
         "--timeout-seconds",
         type=float,
@@ -44,6 +72,11 @@ def parse_args() -> argparse.Namespace:
         default="runs",
         help="Directory for JSON result artifacts.",
     )
+    parser.add_argument(
+        "--trace-file",
+        default=None,
+        help="Record stage spans and write a Chrome trace-event JSON file (open in Perfetto).",
+    )
     return parser.parse_args()
 
 
@@ -56,6 +89,7 @@ def write_results_json(args: argparse.Namespace, selected: list[str], results: l
         "created_at": dt.datetime.now(dt.timezone.utc).isoformat(),
         "pipelines": selected,
         "source_flac": str(Path(args.flac_file).expanduser().resolve()),
+        "aggregates": aggregate_results(results),
         "results": results,
     }
     output_path.write_text(json.dumps(payload, indent=2), encoding="utf-8")
@@ -64,6 +98,18 @@ def write_results_json(args: argparse.Namespace, selected: list[str], results: l
 
 def main() -> int:
     args = parse_args()
+    if args.trace_file:
+        enable_tracing()
+    try:
+        register_pipeline_configs(args.pipelines_config)
+    except Exception as exc:  # noqa: BLE001
+        print(f"Pipelines config error: {exc}", file=sys.stderr)
+        return 2
+    try:
+        configure_scheduler(rate_limits=args.rate_limit, max_retries=args.max_retries)
+    except ValueError as exc:
+        print(f"Input error: {exc}", file=sys.stderr)
+        return 2
     if args.list_pipelines:
         print(available_pipelines_text())
         return 0
@@ -91,8 +137,11 @@ def main() -> int:
         print_results=True,
     )
 
-    output_path = write_results_json(args, selected, results)
+    with span("artifact.write"):
+        output_path = write_results_json(args, selected, results)
     print(f"\nSaved results: {output_path}")
+    if args.trace_file:
+        print(f"Saved trace: {export_chrome_trace(args.trace_file)}")
     return 1 if had_error else 0
 
 
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""Lightweight span tracing with Chrome trace-event / Perfetto export.
+
+Tracing is off by default. While disabled, `span()` returns a shared no-op
+context manager, so instrumented code pays one global lookup and one call per
+span. Enable with `enable_tracing()`, then write the collected spans with
+`export_chrome_trace(path)` and open the file in chrome://tracing or
+https://ui.perfetto.dev.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+TRACE_MAX_EVENTS = 1_000_000
+
+_enabled = False
+_events: list[dict[str, Any]] = []
+_lock = threading.Lock()
+_origin_ns = time.perf_counter_ns()
+_dropped = 0
+_thread_names: dict[int, str] = {}
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> _NoopSpan:
+        return self
+
+    def __exit__(self, *_exc) -> None:
+        return None
+
+    def set(self, **_args: Any) -> None:
+        return None
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _Span:
+    __slots__ = ("name", "cat", "args", "_start_ns")
+
+    def __init__(self, name: str, cat: str, args: dict[str, Any]):
+        self.name = name
+        self.cat = cat
+        self.args = args
+        self._start_ns = 0
+
+    def __enter__(self) -> _Span:
+        self._start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, _exc, _tb) -> None:
+        end_ns = time.perf_counter_ns()
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        _record(
+            {
+                "name": self.name,
+                "cat": self.cat,
+                "ph": "X",
+                "ts": (self._start_ns - _origin_ns) / 1000,
+                "dur": (end_ns - self._start_ns) / 1000,
+                "pid": os.getpid(),
+                "tid": threading.get_ident(),
+                "args": self.args,
+            }
+        )
+
+    def set(self, **args: Any) -> None:
+        """Attach extra args discovered while the span is open."""
+        self.args.update(args)
+
+
+def _record(event: dict[str, Any]) -> None:
+    global _dropped
+    with _lock:
+        if len(_events) >= TRACE_MAX_EVENTS:
+            _dropped += 1
+            return
+        _events.append(event)
+        if event["tid"] not in _thread_names:
+            _thread_names[event["tid"]] = threading.current_thread().name
+
+
+def enable_tracing() -> None:
+    global _enabled
+    _enabled = True
+
+
+def disable_tracing() -> None:
+    global _enabled
+    _enabled = False
+
+
+def tracing_enabled() -> bool:
+    return _enabled
+
+
+def span(name: str, cat: str = "yada", **args: Any) -> _Span | _NoopSpan:
+    """Time a block: `with span("asr.request", pipeline="openai"): ...`."""
+    if not _enabled:
+        return _NOOP_SPAN
+    return _Span(name, cat, args)
+
+
+def instant(name: str, cat: str = "yada", **args: Any) -> None:
+    """Record a point-in-time marker (e.g. the moment recording stopped)."""
+    if not _enabled:
+        return
+    _record(
+        {
+            "name": name,
+            "cat": cat,
+            "ph": "i",
+            "s": "t",
+            "ts": (time.perf_counter_ns() - _origin_ns) / 1000,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": args,
+        }
+    )
+
+
+def clear_trace() -> None:
+    global _dropped
+    with _lock:
+        _events.clear()
+        _thread_names.clear()
+        _dropped = 0
+
+
+def export_chrome_trace(path: str | Path) -> Path:
+    """Write collected events as Chrome trace-event JSON, with thread names."""
+    output = Path(path).expanduser().resolve()
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with _lock:
+        events = list(_events)
+        dropped = _dropped
+        names = dict(_thread_names)
+    metadata = [
+        {
+            "name": "thread_name",
+            "ph": "M",
+            "pid": os.getpid(),
+            "tid": tid,
+            "args": {"name": names.get(tid, f"thread-{tid}")},
+        }
+        for tid in sorted({event["tid"] for event in events})
+    ]
+    payload = {
+        "traceEvents": metadata + events,
+        "displayTimeUnit": "ms",
+        "otherData": {"dropped_events": dropped},
+    }
+    output.write_text(json.dumps(payload), encoding="utf-8")
+    return output
@@ -1,3 +1,4 @@
+use std::collections::HashMap;
 use std::sync::{mpsc, Arc, Mutex};
 
 use zbus::interface;
@@ -93,49 +94,28 @@ fn spawn_capture_thread(capture_err: Arc<SharedCaptureError>) -> mpsc::Sender<Ca
     tx
 }
 
+/// Recordings whose capture has ended but which have not been transcribed yet.
+#[derive(Default)]
+struct PendingDictations {
+    next_id: u64,
+    audio: HashMap<u64, CapturedAudio>,
+}
+
 struct YadaLinux {
     state: Arc<Mutex<bool>>,
     capture_tx: mpsc::Sender<CaptureCommand>,
+    pending: Arc<Mutex<PendingDictations>>,
 }
 
-#[interface(name = "dev.yada.Linux")]
 impl YadaLinux {
-    async fn start(&self) -> zbus::fdo::Result<()> {
-        {
-            let mut recording = self.state.lock().unwrap();
-            if *recording {
-                return Ok(());
-            }
-            *recording = true;
-        }
-
-        let capture_tx = self.capture_tx.clone();
-        tokio::task::spawn_blocking(move || {
-            let (resp_tx, resp_rx) = mpsc::channel();
-            capture_tx
-                .send(CaptureCommand::Start { resp: resp_tx })
-                .map_err(|e| anyhow::anyhow!(e.to_string()))?;
-            resp_rx
-                .recv()
-                .map_err(|e| anyhow::anyhow!(e.to_string()))?
-                .map_err(|e| anyhow::anyhow!(e))?;
-            Ok::<_, anyhow::Error>(())
-        })
-        .await
-        .map_err(|e| zbus::fdo::Error::Failed(e.to_string()))?
-        .map_err(|e| zbus::fdo::Error::Failed(e.to_string()))?;
-
-        Ok(())
-    }
-
-    async fn stop(&self) -> zbus::fdo::Result<String> {
+    async fn end_capture(&self) -> zbus::fdo::Result<CapturedAudio> {
         {
             let mut recording = self.state.lock().unwrap();
             *recording = false;
         }
 
         let capture_tx = self.capture_tx.clone();
-        let audio = tokio::task::spawn_blocking(move || {
+        tokio::task::spawn_blocking(move || {
             let (resp_tx, resp_rx) = mpsc::channel();
             capture_tx
                 .send(CaptureCommand::Stop { resp: resp_tx })
@@ -147,8 +127,10 @@ impl YadaLinux {
         })
         .await
         .map_err(|e| zbus::fdo::Error::Failed(e.to_string()))?
-        .map_err(|e| zbus::fdo::Error::Failed(e.to_string()))?;
+        .map_err(|e| zbus::fdo::Error::Failed(e.to_string()))
+    }
 
+    async fn transcribe_audio(audio: CapturedAudio) -> zbus::fdo::Result<String> {
         if audio.samples_pcm16_mono.is_empty() {
             return Ok(String::new());
         }
@@ -174,6 +156,67 @@ impl YadaLinux {
 
         Ok(rewritten)
     }
+}
+
+#[interface(name = "dev.yada.Linux")]
+impl YadaLinux {
+    async fn start(&self) -> zbus::fdo::Result<()> {
+        {
+            let mut recording = self.state.lock().unwrap();
+            if *recording {
+                return Ok(());
+            }
+            *recording = true;
+        }
+
+        let capture_tx = self.capture_tx.clone();
+        tokio::task::spawn_blocking(move || {
+            let (resp_tx, resp_rx) = mpsc::channel();
+            capture_tx
+                .send(CaptureCommand::Start { resp: resp_tx })
+                .map_err(|e| anyhow::anyhow!(e.to_string()))?;
+            resp_rx
+                .recv()
+                .map_err(|e| anyhow::anyhow!(e.to_string()))?
+                .map_err(|e| anyhow::anyhow!(e))?;
+            Ok::<_, anyhow::Error>(())
+        })
+        .await
+        .map_err(|e| zbus::fdo::Error::Failed(e.to_string()))?
+        .map_err(|e| zbus::fdo::Error::Failed(e.to_string()))?;
+
+        Ok(())
+    }
+
+    /// End capture and transcribe in one call.
+    async fn stop(&self) -> zbus::fdo::Result<String> {
+        let audio = self.end_capture().await?;
+        Self::transcribe_audio(audio).await
+    }
+
+    /// End capture and return an id for `Transcribe`. Replies only once the
+    /// capture thread has stopped, so a `Start` sent after the reply always
+    /// begins a new recording.
+    async fn stop_capture(&self) -> zbus::fdo::Result<u64> {
+        let audio = self.end_capture().await?;
+        let mut pending = self.pending.lock().unwrap();
+        let id = pending.next_id;
+        pending.next_id += 1;
+        pending.audio.insert(id, audio);
+        Ok(id)
+    }
+
+    /// Transcribe and rewrite a recording ended by `StopCapture`.
+    async fn transcribe(&self, id: u64) -> zbus::fdo::Result<String> {
+        let audio = self
+            .pending
+            .lock()
+            .unwrap()
+            .audio
+            .remove(&id)
+            .ok_or_else(|| zbus::fdo::Error::InvalidArgs(format!("unknown dictation id {id}")))?;
+        Self::transcribe_audio(audio).await
+    }
 
     fn ping(&self) -> zbus::fdo::Result<String> {
         Ok("pong".to_string())
@@ -185,7 +228,11 @@ async fn main() -> anyhow::Result<()> {
     let state = Arc::new(Mutex::new(false));
     let capture_err = Arc::new(SharedCaptureError::default());
     let capture_tx = spawn_capture_thread(Arc::clone(&capture_err));
-    let svc = YadaLinux { state, capture_tx };
+    let svc = YadaLinux {
+        state,
+        capture_tx,
+        pending: Arc::new(Mutex::new(PendingDictations::default())),
+    };
 
     let _conn = zbus::ConnectionBuilder::session()?
         .name("dev.yada.Linux")?
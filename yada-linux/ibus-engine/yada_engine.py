@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 
+import queue
 import signal
 import subprocess
 import sys
@@ -34,12 +35,25 @@ def _is_trigger(keyval, state):
 class YadaEngine(IBus.Engine):
     def __init__(self):
         super().__init__()
-        # States: idle -> recording -> processing -> idle
+        # States: idle -> recording -> idle
+        # Stopping hands the dictation off to the daemon and returns to idle
+        # right away, so the next utterance can start while earlier ones are
+        # still being transcribed. Results are committed in spoken order.
         # We keep D-Bus calls off the key event path so the engine UI
         # stays responsive while the daemon does network work.
         self._state = "idle"
         self._lock = threading.Lock()
         self._last_trigger_ts = 0.0
+        # Dictation sequence numbers: _next_seq is assigned at Stop,
+        # _next_commit is the oldest dictation not yet committed.
+        self._next_seq = 0
+        self._next_commit = 0
+        self._results = {}
+        # Start/Stop must reach the daemon in trigger order, so one worker
+        # sends them and waits until the daemon has ended capture; only
+        # waiting for transcripts happens in parallel.
+        self._control = queue.Queue()
+        threading.Thread(target=self._control_loop, daemon=True).start()
 
     def do_process_key_event(self, keyval, keycode, state):
         # Debug: log trigger key info.
@@ -66,22 +80,36 @@ class YadaEngine(IBus.Engine):
         with self._lock:
             if self._state == "idle":
                 self._state = "recording"
-                self.update_auxiliary_text(
-                    IBus.Text.new_from_string("Yada: Listening..."), True
-                )
-                threading.Thread(target=self._start_async, daemon=True).start()
-                return True
+                self._control.put(self._start_async)
+            else:
+                self._state = "idle"
+                seq = self._next_seq
+                self._next_seq += 1
+                self._control.put(lambda: self._stop_async(seq))
+        self._update_status()
+        return True
 
-            if self._state == "recording":
-                self._state = "processing"
-                self.update_auxiliary_text(
-                    IBus.Text.new_from_string("Yada: Processing..."), True
-                )
-                threading.Thread(target=self._stop_async, daemon=True).start()
-                return True
+    def _control_loop(self):
+        while True:
+            self._control.get()()
 
-            # processing: swallow triggers so we don't stack requests.
-            return True
+    def _update_status(self):
+        with self._lock:
+            recording = self._state == "recording"
+            pending = self._next_seq - self._next_commit
+
+        if recording and pending:
+            status = "Yada: Listening... (%d processing)" % pending
+        elif recording:
+            status = "Yada: Listening..."
+        elif pending:
+            status = "Yada: Processing..."
+            if pending > 1:
+                status = "Yada: Processing %d..." % pending
+        else:
+            self.update_auxiliary_text(IBus.Text.new_from_string(""), False)
+            return
+        self.update_auxiliary_text(IBus.Text.new_from_string(status), True)
 
     def _start_async(self):
         ok, err_or_text = _dbus_call("Start")
@@ -90,7 +118,8 @@ class YadaEngine(IBus.Engine):
 
         def _fail():
             with self._lock:
-                self._state = "idle"
+                if self._state == "recording":
+                    self._state = "idle"
             self.update_auxiliary_text(
                 IBus.Text.new_from_string("Yada: Start failed"), True
             )
@@ -98,22 +127,38 @@ class YadaEngine(IBus.Engine):
 
         _schedule(_fail)
 
-    def _stop_async(self):
-        ok, text_or_err = _dbus_call("Stop")
+    def _stop_async(self, seq):
+        # Wait for capture to end before the worker takes the next Start;
+        # otherwise that Start can reach the daemon first and be ignored.
+        ok, dictation = _dbus_call("StopCapture")
+        if not (ok and dictation.isdigit()):
+            # Still finish this slot so later dictations are not held back.
+            _schedule(lambda: self._finish(seq, False, dictation))
+            return
 
-        def _finish():
-            with self._lock:
-                self._state = "idle"
+        def _wait():
+            ok, text_or_err = _dbus_call("Transcribe", "uint64 " + dictation)
+            _schedule(lambda: self._finish(seq, ok, text_or_err))
 
-            self.update_auxiliary_text(IBus.Text.new_from_string(""), False)
-            if ok and text_or_err:
-                self.commit_text(IBus.Text.new_from_string(text_or_err))
-            return False
+        threading.Thread(target=_wait, daemon=True).start()
 
-        _schedule(_finish)
+    def _finish(self, seq, ok, text_or_err):
+        # Hold results that finish early until every earlier dictation is in.
+        with self._lock:
+            self._results[seq] = text_or_err if ok else ""
+            ready = []
+            while self._next_commit in self._results:
+                ready.append(self._results.pop(self._next_commit))
+                self._next_commit += 1
+
+        for text in ready:
+            if text:
+                self.commit_text(IBus.Text.new_from_string(text))
+        self._update_status()
+        return False
 
 
-def _dbus_call(method):
+def _dbus_call(method, *args):
     # Minimal dependency approach: use gdbus CLI.
     # This keeps the engine tiny; Rust daemon owns the API.
     cmd = [
@@ -126,24 +171,29 @@ def _dbus_call(method):
         DBUS_PATH,
         "--method",
         f"{DBUS_IFACE}.{method}",
+        *args,
     ]
     try:
         out = subprocess.check_output(cmd, stderr=subprocess.STDOUT, text=True).strip()
     except subprocess.CalledProcessError as e:
         sys.stderr.write(e.output)
         return (False, e.output.strip())
+    except OSError as e:
+        return (False, str(e))
 
     # Methods that return no value.
     if out == "()":
         return (True, "")
 
-    # gdbus prints something like: "('text',)"
+    # gdbus prints something like: "('text',)" or "(uint64 3,)"
     if out.startswith("(") and out.endswith(")"):
         inner = out[1:-1].strip()
         if inner.startswith("'") and inner.endswith("',"):
             return (True, inner[1:-2])
         if inner.startswith("'") and inner.endswith("'"):
             return (True, inner[1:-1])
+        if inner.startswith("uint64 "):
+            return (True, inner[len("uint64 "):].rstrip(","))
     return (True, "")
 
 